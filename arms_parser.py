@@ -0,0 +1,288 @@
+"""Server-side parsers for ARMS pages built on the stdlib HTML parser.
+
+They read the same ``page_specs`` the Selenium engine's in-page script reads,
+so either engine (and either Selenium parse mode) returns the same payload
+for the same page.
+"""
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import page_specs
+
+# The login form's username box: ARMS serves it in place of any page once the
+# session expired (EXTRACT_JS looks for the same element)
+_LOGIN_FIELD = re.compile(r"""\bid\s*=\s*["']?txtusername\b""", re.IGNORECASE)
+
+# The leading number JavaScript's parseInt(text, 10) / parseFloat(text) read, so
+# "12 (OD)" is 12 and "85.5 *" is 85.5 here as in EXTRACT_JS
+_LEADING_INT = re.compile(r"[+-]?\d+")
+_LEADING_FLOAT = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+
+
+class ArmsPageParser(HTMLParser):
+    """Collects element text by id, image sources, table cells and form inputs.
+
+    Tables listed in ``table_ids`` are returned as lists of rows, each row a
+    list of ``td`` cells ``{"text": ..., "span": ...}`` where ``span`` is the
+    text of the first ``<span>`` in the cell (None if there is none); the
+    texts of a table's first row of ``th`` cells are kept in ``headers``.
+    Unclosed ``tr``/``td`` tags are closed implicitly the way browsers do.
+    """
+
+    def __init__(self, text_ids=(), src_ids=(), table_ids=()):
+        super().__init__(convert_charrefs=True)
+        self.text_ids = set(text_ids)
+        self.src_ids = set(src_ids)
+        self.texts = {}
+        self.srcs = {}
+        self.tables = {table_id: [] for table_id in table_ids}
+        self.headers = {}
+        self.found_tables = set()
+        self.inputs = []
+        self.form_action = None
+
+        # Open text captures: [element id, tag, nesting, parts]
+        self._captures = []
+        self._table = None
+        self._table_depth = 0
+        self._row = None
+        self._header = None
+        self._cell = None
+        self._span_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        element_id = attrs.get("id")
+
+        if tag == "input":
+            self.inputs.append(attrs)
+        elif tag == "form" and self.form_action is None:
+            self.form_action = attrs.get("action")
+        if element_id in self.src_ids:
+            self.srcs[element_id] = attrs.get("src") or ""
+
+        for capture in self._captures:
+            if capture[1] == tag:
+                capture[2] += 1
+        if element_id in self.text_ids and tag not in VOID_TAGS:
+            self._captures.append([element_id, tag, 1, []])
+
+        if tag == "table":
+            if self._table is not None:
+                self._table_depth += 1
+            elif element_id in self.tables:
+                self._table = element_id
+                self._table_depth = 1
+                self.found_tables.add(element_id)
+        elif self._table is not None and self._table_depth == 1:
+            if tag == "tr":
+                self._close_row()
+                self._row = []
+                self._header = []
+            elif tag in ("td", "th"):
+                self._close_cell()
+                if self._row is None:
+                    self._row = []
+                    self._header = []
+                self._cell = {"tag": tag, "text": [], "span": None}
+            elif tag == "span" and self._cell is not None:
+                if self._span_depth:
+                    self._span_depth += 1
+                elif self._cell["span"] is None:
+                    self._cell["span"] = []
+                    self._span_depth = 1
+
+    def handle_endtag(self, tag):
+        for capture in list(self._captures):
+            if capture[1] == tag:
+                capture[2] -= 1
+                if capture[2] == 0:
+                    self._captures.remove(capture)
+                    self.texts.setdefault(capture[0], "".join(capture[3]).strip())
+
+        if self._table is None:
+            return
+        if tag == "table":
+            self._table_depth -= 1
+            if self._table_depth == 0:
+                self._close_row()
+                self._table = None
+        elif self._table_depth == 1:
+            if tag == "span" and self._span_depth:
+                self._span_depth -= 1
+            elif tag in ("td", "th"):
+                self._close_cell()
+            elif tag == "tr":
+                self._close_row()
+
+    def handle_data(self, data):
+        for capture in self._captures:
+            capture[3].append(data)
+        if self._cell is not None:
+            self._cell["text"].append(data)
+            if self._span_depth:
+                self._cell["span"].append(data)
+
+    def close(self):
+        super().close()
+        self._close_row()
+        for capture in self._captures:
+            self.texts.setdefault(capture[0], "".join(capture[3]).strip())
+        self._captures = []
+
+    def _close_cell(self):
+        if self._cell is None:
+            return
+        cell = self._cell
+        self._cell = None
+        self._span_depth = 0
+        if cell["tag"] == "td":
+            span = cell["span"]
+            self._row.append({
+                "text": "".join(cell["text"]).strip(),
+                "span": "".join(span).strip() if span is not None else None,
+            })
+        else:
+            self._header.append("".join(cell["text"]).strip())
+
+    def _close_row(self):
+        self._close_cell()
+        if self._row is not None and self._table is not None:
+            self.tables[self._table].append(self._row)
+            if self._header and self._table not in self.headers:
+                self.headers[self._table] = self._header
+        self._row = None
+        self._header = None
+
+
+def parse_page(html, text_ids=(), src_ids=(), table_ids=()):
+    parser = ArmsPageParser(text_ids, src_ids, table_ids)
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+def is_login_page(html):
+    """Whether ``html`` is the ARMS login form."""
+    return _LOGIN_FIELD.search(html) is not None
+
+
+def parse_login_form(html):
+    """Return (form action, input attrs list) of the ASP.NET login page."""
+    parser = parse_page(html)
+    return parser.form_action, parser.inputs
+
+
+def parse_spec(spec, html, page_url=""):
+    """Read ``spec`` (a ``page_specs.PageSpec``) from ``html``.
+
+    Returns the dict ``page_specs.EXTRACT_JS`` would return in the browser,
+    or None if the spec's table is missing. Only ``textContent`` and ``src``
+    fields can be read from markup; ``src`` is resolved against ``page_url``.
+    """
+    fields = spec.fields
+    unsupported = [name for name, field in fields.items() if field["property"] not in ("textContent", "src")]
+    if unsupported:
+        raise ValueError("Cannot parse fields %s of the %s page from HTML" % (", ".join(unsupported), spec.name))
+    table = spec.table
+    parser = parse_page(
+        html,
+        text_ids=[field["id"] for field in fields.values() if field["property"] == "textContent"],
+        src_ids=[field["id"] for field in fields.values() if field["property"] == "src"],
+        table_ids=(table["id"],) if table else (),
+    )
+
+    data = {}
+    for name, field in fields.items():
+        if field["property"] == "src":
+            src = parser.srcs.get(field["id"])
+            data[name] = urljoin(page_url, src) if src else ""
+        else:
+            data[name] = parser.texts.get(field["id"], "")
+    if table:
+        if table["id"] not in parser.found_tables:
+            return None
+        rows = parser.tables[table["id"]]
+        # GridView headers are <th>; fall back to a first row of <td> headers
+        headers = parser.headers.get(table["id"]) or ([cell["text"] for cell in rows[0]] if rows else [])
+        data[table["key"]] = _records(table, rows, headers)
+    return data
+
+
+def parse_profile(html, page_url=""):
+    return parse_spec(page_specs.PROFILE, html, page_url)
+
+
+def parse_grades(html):
+    """Return every course row of ``tblGridViewComplete`` (grade points are applied
+    later by ``grading``), or None if the table is missing."""
+    data = parse_spec(page_specs.GRADES, html)
+    return data["rows"] if data is not None else None
+
+
+def parse_attendance(html):
+    """Return attendance rows from ``tblStudent``, or None if the table is missing."""
+    data = parse_spec(page_specs.ATTENDANCE, html)
+    return data["rows"] if data is not None else None
+
+
+def _records(table, rows, headers):
+    columns = table["columns"]
+    indexes = {
+        name: _column(headers, column["header"]) if column["header"] else column["index"]
+        for name, column in columns.items()
+    }
+    records = []
+    for cells in rows[table["skip_rows"]:]:
+        if len(cells) < table["min_cells"]:
+            continue
+        record = {}
+        for name, column in columns.items():
+            index = indexes[name]
+            value = None
+            if 0 <= index < len(cells):
+                cell = cells[index]
+                value = _convert((cell["span"] or "") if column["span"] else cell["text"], column)
+            if value is None and column["required"]:
+                break
+            record[name] = value
+        else:
+            records.append(record)
+    return records
+
+
+def _convert(text, column):
+    if column["strip"]:
+        text = text.replace(column["strip"], "")
+    text = text.strip()
+    if column["type"] == "int":
+        return _parse_int(text)
+    if column["type"] == "float":
+        return _parse_number(text)
+    return text
+
+
+def _parse_int(text):
+    match = _LEADING_INT.match(text.strip())
+    return int(match.group()) if match else None
+
+
+def _column(headers, word):
+    """Index of the first header containing ``word`` (case-insensitive), or -1."""
+    for index, header in enumerate(headers):
+        if word in header.lower():
+            return index
+    return -1
+
+
+def _parse_number(text):
+    value = _parse_float(text)
+    return int(value) if value is not None and value.is_integer() else value
+
+
+def _parse_float(text):
+    match = _LEADING_FLOAT.match(text.strip())
+    return float(match.group()) if match else None
@@ -0,0 +1,112 @@
+"""Closed-form attendance arithmetic.
+
+With ``a`` classes attended out of ``T`` and a target of ``p`` percent:
+
+* classes that can still be missed: the largest ``k`` with
+  ``a / (T + k) >= p / 100``, i.e. ``floor((100a - pT) / p)``;
+* classes to attend in a row to reach the target: the smallest ``n`` with
+  ``(a + n) / (T + n) >= p / 100``, i.e. ``ceil((pT - 100a) / (100 - p))``.
+  A 100% target that has already been missed can never be reached.
+
+Both are O(1) and computed with exact fractions, so no row, however large
+or malformed, can keep a request thread looping.
+"""
+import math
+from fractions import Fraction
+
+DEFAULT_THRESHOLD = 80
+
+
+def check_threshold(threshold):
+    """``threshold`` as an exact Fraction; raises ValueError unless 0 < threshold <= 100."""
+    try:
+        percent = Fraction(threshold) if isinstance(threshold, int) else Fraction(str(threshold))
+    except (TypeError, ValueError):
+        raise ValueError("Attendance threshold must be a number, got %r" % (threshold,))
+    if not 0 < percent <= 100:
+        raise ValueError("Attendance threshold must be above 0 and at most 100, got %s" % threshold)
+    return percent
+
+
+def _counts(attended, total):
+    if not isinstance(attended, int) or not isinstance(total, int) or attended < 0 or total < 0:
+        return None
+    return attended, total
+
+
+def safe_leave(attended, total, threshold=DEFAULT_THRESHOLD):
+    """Classes that can be missed while staying at or above ``threshold`` percent.
+
+    0 when already below it; None when the counts are missing or negative.
+    """
+    counts = _counts(attended, total)
+    if counts is None:
+        return None
+    attended, total = counts
+    percent = check_threshold(threshold)
+    return max(0, math.floor((100 * attended - percent * total) / percent))
+
+
+def classes_needed(attended, total, threshold=DEFAULT_THRESHOLD):
+    """Classes to attend in a row to reach ``threshold`` percent.
+
+    0 when already there; None when the counts are missing or negative, or
+    when the target can no longer be reached (100% after a missed class).
+    """
+    counts = _counts(attended, total)
+    if counts is None:
+        return None
+    attended, total = counts
+    percent = check_threshold(threshold)
+    deficit = percent * total - 100 * attended
+    if deficit <= 0:
+        return 0
+    if percent == 100:
+        return None
+    return math.ceil(deficit / (100 - percent))
+
+
+def annotate(records, thresholds=(DEFAULT_THRESHOLD,)):
+    """Attendance rows with safe leave and classes needed, in one pass over all courses.
+
+    Keeps the payload fields the UI reads (``safe_leave_days`` and
+    ``classes_needed_for_80``, both at 80%) and adds a ``targets`` entry per
+    threshold.
+    """
+    percents = [(threshold, check_threshold(threshold)) for threshold in thresholds]
+    results = []
+    for record in records:
+        attended = record.get("attended")
+        total = record.get("total")
+        current_percentage = record.get("current_percentage")
+        if current_percentage is None and _counts(attended, total) and total:
+            current_percentage = 100.0 * attended / total
+
+        results.append({
+            "course": record.get("course"),
+            "attended": attended,
+            "total": total,
+            "current_percentage": round(current_percentage, 2) if current_percentage is not None else None,
+            "safe_leave_days": safe_leave(attended, total, DEFAULT_THRESHOLD),
+            "classes_needed_for_80": _needed(attended, total, current_percentage, DEFAULT_THRESHOLD),
+            "targets": {
+                _label(threshold): {
+                    "safe_leave_days": safe_leave(attended, total, percent),
+                    "classes_needed": _needed(attended, total, current_percentage, percent),
+                }
+                for threshold, percent in percents
+            },
+        })
+    return results
+
+
+def _needed(attended, total, current_percentage, threshold):
+    # ARMS' own percentage may count on-duty leave; trust it when it already meets the target
+    if current_percentage is not None and current_percentage >= threshold:
+        return 0
+    return classes_needed(attended, total, threshold)
+
+
+def _label(threshold):
+    # 75 -> "75", 72.5 -> "72.5"
+    return ("%f" % threshold).rstrip("0").rstrip(".") if isinstance(threshold, float) else str(threshold)
@@ -0,0 +1,327 @@
+"""Load test: concurrent simulated students against the grade fetcher.
+
+Each simulated student sends ``--requests`` scrapes (cycling through
+``--endpoints``) with at most ``--concurrency`` requests in flight overall;
+a student's first request needs a login, the rest should reuse the session.
+Meanwhile Chrome processes on this machine are sampled from /proc. The JSON
+report has latency percentiles and throughput per endpoint and per session
+state (cold login / warm session / restored from cookies / cache hit), the
+resource samples and the app's and mock portal's own counters.
+
+Against a running app (pointed at ``bench/mock_arms.py``)::
+
+    python bench/load_test.py --url http://127.0.0.1:5000 --students 20 --concurrency 8
+
+Self-contained, starting the mock portal and the app itself::
+
+    python bench/load_test.py --spawn --students 20 --output report.json
+
+With ``--baseline old.json`` the run fails (exit 1) when p95 latency or
+throughput regress by more than ``--max-regression``.
+"""
+import argparse
+import collections
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies, elapsed):
+    return {
+        "requests": len(latencies),
+        "throughput": round(len(latencies) / elapsed, 3) if elapsed > 0 else None,
+        "mean": round(sum(latencies) / len(latencies), 4) if latencies else None,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies) if latencies else None,
+    }
+
+
+def chrome_processes():
+    """(count, total RSS bytes) of chrome / chromedriver processes, read from /proc."""
+    count = rss = 0
+    try:
+        pids = [name for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return None, None  # no procfs (not Linux)
+    for pid in pids:
+        try:
+            with open("/proc/%s/comm" % pid) as f:
+                comm = f.read().strip().lower()
+            if "chrome" not in comm:
+                continue
+            with open("/proc/%s/statm" % pid) as f:
+                rss += int(f.read().split()[1]) * PAGE_SIZE
+            count += 1
+        except (OSError, ValueError, IndexError):
+            continue  # exited while we looked
+    return count, rss
+
+
+def process_rss(pid):
+    try:
+        with open("/proc/%d/statm" % pid) as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Sampler(threading.Thread):
+    """Samples Chrome process count and RSS (and the app's RSS) every ``interval`` seconds."""
+
+    def __init__(self, interval, app_pid=None):
+        super().__init__(name="sampler", daemon=True)
+        self.interval = interval
+        self.app_pid = app_pid
+        self.samples = []
+        self._done = threading.Event()
+        self._began = time.time()
+
+    def run(self):
+        while True:
+            count, rss = chrome_processes()
+            sample = {"t": round(time.time() - self._began, 2), "chrome_processes": count, "chrome_rss": rss}
+            if self.app_pid:
+                sample["app_rss"] = process_rss(self.app_pid)
+            self.samples.append(sample)
+            if self._done.wait(self.interval):
+                return
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def summary(self):
+        def peak(key):
+            values = [s[key] for s in self.samples if s.get(key) is not None]
+            return max(values) if values else None
+        return {
+            "peak_chrome_processes": peak("chrome_processes"),
+            "peak_chrome_rss": peak("chrome_rss"),
+            "peak_app_rss": peak("app_rss"),
+        }
+
+
+def run_load(args):
+    local = threading.local()
+    results = []
+    lock = threading.Lock()
+
+    def http():
+        if getattr(local, "session", None) is None:
+            local.session = requests.Session()
+        return local.session
+
+    def one_request(student, index):
+        endpoint = args.endpoints[index % len(args.endpoints)]
+        body = {
+            "username": "%s%04d" % (args.user_prefix, student),
+            "password": args.password,
+            "force_refresh": not args.use_cache,
+        }
+        start = time.time()
+        try:
+            response = http().post(args.url + "/" + endpoint, json=body, timeout=args.timeout)
+            payload = response.json()
+            ok = response.ok and bool(payload.get("success"))
+            state = "cached" if payload.get("cached") else payload.get("session", "unknown")
+            error = None if ok else payload.get("message") or "HTTP %d" % response.status_code
+        except (requests.RequestException, ValueError) as e:
+            ok, state, error = False, "error", str(e)
+        latency = time.time() - start
+        with lock:
+            results.append({
+                "endpoint": endpoint, "student": student, "index": index,
+                "latency": round(latency, 4), "ok": ok, "state": state if ok else "failed", "error": error,
+            })
+
+    # Round-robin over students so every student's first (cold) request goes out first
+    tasks = [(student, index) for index in range(args.requests) for student in range(args.students)]
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for student, index in tasks:
+            executor.submit(one_request, student, index)
+    return results, time.time() - started
+
+
+def build_report(args, results, elapsed, sampler, app_stats, mock_stats):
+    ok = [r for r in results if r["ok"]]
+    by_endpoint = collections.defaultdict(list)
+    by_state = collections.defaultdict(list)
+    for r in ok:
+        by_endpoint[r["endpoint"]].append(r["latency"])
+        by_state[r["state"]].append(r["latency"])
+    states = collections.Counter(r["state"] for r in results)
+    warm = states["warm"] + states["cached"]
+    errors = collections.Counter(r["error"] for r in results if not r["ok"])
+    return {
+        "config": {
+            "url": args.url, "students": args.students, "requests_per_student": args.requests,
+            "concurrency": args.concurrency, "endpoints": args.endpoints, "use_cache": args.use_cache,
+        },
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(time.time() - elapsed)),
+        "elapsed": round(elapsed, 3),
+        "overall": summarize([r["latency"] for r in ok], elapsed),
+        "failed": len(results) - len(ok),
+        "errors": dict(errors.most_common(10)),
+        "endpoints": {name: summarize(values, elapsed) for name, values in sorted(by_endpoint.items())},
+        "sessions": {
+            "counts": dict(states),
+            "latency": {name: summarize(values, elapsed) for name, values in sorted(by_state.items())},
+            # Share of successful requests that did not need a login
+            "warm_ratio": round(warm / len(ok), 4) if ok else None,
+        },
+        "resources": dict(sampler.summary(), samples=sampler.samples),
+        "app_stats": app_stats,
+        "mock_stats": mock_stats,
+    }
+
+
+def compare(report, baseline, max_regression):
+    """Regressions of ``report`` against ``baseline`` beyond ``max_regression`` (a fraction)."""
+    problems = []
+    for name, new in [("overall", report["overall"])] + sorted(report["endpoints"].items()):
+        old = baseline["overall"] if name == "overall" else baseline.get("endpoints", {}).get(name)
+        if not old:
+            continue
+        if old.get("p95") and new.get("p95") and new["p95"] > old["p95"] * (1 + max_regression):
+            problems.append("%s p95 %.3fs -> %.3fs" % (name, old["p95"], new["p95"]))
+        if old.get("throughput") and new.get("throughput") and new["throughput"] < old["throughput"] * (1 - max_regression):
+            problems.append("%s throughput %.2f/s -> %.2f/s" % (name, old["throughput"], new["throughput"]))
+    if report["failed"] > baseline.get("failed", 0):
+        problems.append("failed requests %d -> %d" % (baseline.get("failed", 0), report["failed"]))
+    return problems
+
+
+def get_json(url):
+    try:
+        return requests.get(url, timeout=10).json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def wait_until_up(url, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            sys.exit("%s exited with code %s" % (url, process.returncode))
+        try:
+            requests.get(url, timeout=2)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    sys.exit("%s did not come up within %ds" % (url, timeout))
+
+
+def spawn(args):
+    """Start the mock portal and the app; returns the processes."""
+    mock_url = "http://127.0.0.1:%d" % args.mock_port
+    mock = subprocess.Popen([
+        sys.executable, os.path.join(REPO, "bench", "mock_arms.py"), "--port", str(args.mock_port),
+        "--latency-ms", str(args.mock_latency_ms), "--courses", str(args.mock_courses),
+    ] + args.mock_args)
+    wait_until_up(mock_url + "/__stats", mock)
+    env = dict(os.environ, ARMS_BASE_URL=mock_url)
+    app = subprocess.Popen(
+        [sys.executable, "-c", "import app; app.app.run(host='127.0.0.1', port=%d, threaded=True)" % args.app_port],
+        cwd=REPO, env=env,
+    )
+    args.url = "http://127.0.0.1:%d" % args.app_port
+    args.mock_url = mock_url
+    wait_until_up(args.url + "/stats", app)
+    return [app, mock]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="app under test")
+    parser.add_argument("--mock-url", default=None, help="mock portal, to include its counters in the report")
+    parser.add_argument("--students", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=5, help="requests per student")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight at once")
+    parser.add_argument("--endpoints", default="fetch_grades,attendance", help="comma-separated, cycled per student")
+    parser.add_argument("--user-prefix", default="bench")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--use-cache", action="store_true", help="allow result cache hits (default: force_refresh)")
+    parser.add_argument("--timeout", type=float, default=180)
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="seconds between /proc samples")
+    parser.add_argument("--app-pid", type=int, default=None, help="also sample this process's RSS")
+    parser.add_argument("--output", default=None, help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="earlier report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95/throughput regression (0.2 = 20%%)")
+    spawning = parser.add_argument_group("spawning the mock portal and app")
+    spawning.add_argument("--spawn", action="store_true", help="start bench/mock_arms.py and the app, then stop them")
+    spawning.add_argument("--app-port", type=int, default=5099)
+    spawning.add_argument("--mock-port", type=int, default=5098)
+    spawning.add_argument("--mock-latency-ms", type=float, default=100)
+    spawning.add_argument("--mock-courses", type=int, default=40)
+    spawning.add_argument("--mock-args", default="", help="extra mock_arms.py options, space-separated")
+    args = parser.parse_args()
+    args.endpoints = [name.strip().strip("/") for name in args.endpoints.split(",") if name.strip()]
+    args.mock_args = args.mock_args.split()
+    args.url = args.url.rstrip("/")
+
+    processes = spawn(args) if args.spawn else []
+    if processes and args.app_pid is None:
+        args.app_pid = processes[0].pid
+    sampler = Sampler(args.sample_interval, args.app_pid)
+    try:
+        sampler.start()
+        results, elapsed = run_load(args)
+        sampler.stop()
+        app_stats = get_json(args.url + "/stats")
+        mock_stats = get_json(args.mock_url.rstrip("/") + "/__stats") if args.mock_url else None
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(30)
+
+    report = build_report(args, results, elapsed, sampler, app_stats, mock_stats)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    overall = report["overall"]
+    print(
+        "%d ok / %d failed in %.1fs: %.2f req/s, p50 %.3fs p95 %.3fs p99 %.3fs, warm ratio %s, peak chrome %s procs" % (
+            overall["requests"], report["failed"], report["elapsed"], overall["throughput"] or 0,
+            overall["p50"] or 0, overall["p95"] or 0, overall["p99"] or 0,
+            report["sessions"]["warm_ratio"], report["resources"]["peak_chrome_processes"],
+        ),
+        file=sys.stderr,
+    )
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.max_regression)
+        for problem in problems:
+            print("REGRESSION: " + problem, file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Stand-in for the ARMS student portal, for offline load and latency benchmarks.
+
+Serves the pages the scrapers use (login form, Landing.aspx, DataProfile.aspx,
+MyCourse.aspx with ``tblGridViewComplete`` and AttendanceReport.aspx with
+``tblStudent``) with generated, per-user deterministic data, plus a few heavy
+assets so resource blocking has something to block.
+
+    python bench/mock_arms.py --port 5055 --latency-ms 150 --courses 60
+    ARMS_BASE_URL=http://127.0.0.1:5055 python app.py
+
+Any username logs in with any password except ``--reject-password``.
+``--render script`` fills the profile and tables in client-side after
+``--render-delay-ms``, like the real portal (the HTTP engine then falls back
+to Selenium). ``GET /__stats`` reports logins and page hits,
+``POST /__expire`` logs every session out.
+"""
+import argparse
+import html
+import json
+import random
+import secrets
+import threading
+import time
+from urllib.parse import quote
+
+from flask import Flask, Response, jsonify, redirect, request
+
+GRADES = ["S", "A", "B", "C", "D", "E"]
+FAIL_GRADES = ["U", "RA", "AB"]
+SESSIONS = ["NOV 2022", "APR 2023", "NOV 2023", "APR 2024", "NOV 2024", "APR 2025"]
+SUBJECTS = [
+    "Engineering Mathematics", "Data Structures", "Operating Systems", "Computer Networks",
+    "Database Systems", "Compiler Design", "Machine Learning", "Software Engineering",
+    "Digital Logic", "Theory of Computation", "Cloud Computing", "Cryptography",
+]
+COOKIE = "ASP.NET_SessionId"
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>ARMS - Login</title>{assets}</head>
+<body>
+<form method="post" action="./" id="form1">
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}" />
+<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="CA0B0334" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{validation}" />
+<input name="txtusername" type="text" id="txtusername" />
+<input name="txtpassword" type="password" id="txtpassword" />
+<input type="submit" name="btnlogin" value="Login" id="btnlogin" />
+{error}
+</form>
+</body></html>"""
+
+PORTAL_PAGE = """<!DOCTYPE html>
+<html><head><title>ARMS - {title}</title>{assets}</head>
+<body>
+<div id="menu"><a href="Landing.aspx">Home</a> <a href="DataProfile.aspx">Profile</a>
+<a href="MyCourse.aspx">My Course</a> <a href="AttendanceReport.aspx">Attendance</a></div>
+{body}
+</body></html>"""
+
+ASSETS = """<link rel="stylesheet" href="/assets/site.css" />
+<link rel="preload" href="/assets/font.woff2" as="font" crossorigin />
+<script src="/assets/analytics.js" async></script>"""
+
+# Client-side rendering for --render script: fill ids / table bodies from inline data
+RENDER_SCRIPT = """<script>
+setTimeout(function() {
+    var data = %s;
+    Object.keys(data.text).forEach(function(id) {
+        document.getElementById(id).textContent = data.text[id];
+    });
+    Object.keys(data.tables).forEach(function(id) {
+        var table = document.getElementById(id);
+        data.tables[id].forEach(function(html) { table.insertAdjacentHTML('beforeend', html); });
+    });
+}, %d);
+</script>"""
+
+
+def create_app(latency_ms=0, jitter_ms=0, login_latency_ms=0, courses=40, attendance_rows=8,
+               session_ttl=1200, render="server", render_delay_ms=300, reject_password="wrong", asset_kb=64):
+    app = Flask(__name__)
+    sessions = {}  # token -> [username, last seen]
+    lock = threading.Lock()
+    stats = {"logins": 0, "failed_logins": 0, "expired": 0, "pages": {}}
+
+    def delay(extra_ms=0):
+        ms = latency_ms + extra_ms + (random.uniform(-jitter_ms, jitter_ms) if jitter_ms else 0)
+        if ms > 0:
+            time.sleep(ms / 1000.0)
+
+    def count(page):
+        with lock:
+            stats["pages"][page] = stats["pages"].get(page, 0) + 1
+
+    def current_user():
+        token = request.cookies.get(COOKIE)
+        now = time.time()
+        with lock:
+            entry = sessions.get(token)
+            if entry is None:
+                return None
+            if session_ttl > 0 and now - entry[1] > session_ttl:
+                del sessions[token]
+                stats["expired"] += 1
+                return None
+            entry[1] = now
+            return entry[0]
+
+    def page(title, body, text=None, tables=None):
+        if render == "script":
+            script = RENDER_SCRIPT % (
+                json.dumps({"text": text or {}, "tables": tables or {}}).replace("</", "<\\/"), render_delay_ms
+            )
+            body += script
+        return PORTAL_PAGE.format(title=title, assets=ASSETS, body=body)
+
+    @app.route("/", methods=["GET", "POST"])
+    def login():
+        delay(login_latency_ms)
+        error = ""
+        if request.method == "POST":
+            if "__VIEWSTATE" not in request.form or "__EVENTVALIDATION" not in request.form:
+                return Response("Invalid postback", status=500)
+            username = request.form.get("txtusername", "").strip()
+            password = request.form.get("txtpassword", "")
+            if username and password and password != reject_password:
+                token = secrets.token_hex(12)
+                with lock:
+                    sessions[token] = [username, time.time()]
+                    stats["logins"] += 1
+                response = redirect("/StudentPortal/Landing.aspx")
+                response.set_cookie(COOKIE, token, httponly=True)
+                return response
+            with lock:
+                stats["failed_logins"] += 1
+            error = '<span id="lblerror">Invalid username or password</span>'
+        count("login")
+        return LOGIN_PAGE.format(
+            assets=ASSETS, viewstate=secrets.token_urlsafe(96), validation=secrets.token_urlsafe(24), error=error
+        )
+
+    @app.route("/StudentPortal/<name>")
+    def portal(name):
+        username = current_user()
+        if username is None:
+            # As ASP.NET forms auth: the login page, with the requested page in ReturnUrl
+            return redirect("/?ReturnUrl=" + quote(request.path, safe=""))
+        delay()
+        count(name)
+        if name == "Landing.aspx":
+            return page("Home", '<h2 id="lblwelcome">Welcome %s</h2>' % html.escape(username))
+        if name == "DataProfile.aspx":
+            return profile_page(username)
+        if name == "MyCourse.aspx":
+            return grades_page(username)
+        if name == "AttendanceReport.aspx":
+            return attendance_page(username)
+        return Response("Not found", status=404)
+
+    def profile_page(username):
+        text = {
+            "dvname": "Student %s" % username,
+            "dvregno": username,
+            "dvprogram": "B.E. Computer Science and Engineering",
+        }
+        fields = "".join(
+            '<div id="%s">%s</div>' % (key, "" if render == "script" else html.escape(value))
+            for key, value in text.items()
+        )
+        body = fields + '<img id="imgprofile" src="/assets/photo-%s.jpg" />' % html.escape(username)
+        return page("Profile", body, text=text)
+
+    def grades_page(username):
+        rng = random.Random("grades:" + username)
+        rows = []
+        for i in range(courses):
+            failed = rng.random() < 0.08
+            grade = rng.choice(FAIL_GRADES if failed else GRADES)
+            rows.append(
+                "<tr><td>%d</td><td>CS%04d</td><td>%s</td><td>%s</td><td><span>%s</span></td><td>%s</td>"
+                "<td>%d</td></tr>" % (
+                    i + 1, rng.randint(1000, 9999), rng.choice(SUBJECTS), grade,
+                    "FAIL" if failed else "PASS", rng.choice(SESSIONS), rng.choice((1, 2, 3, 3, 4)),
+                )
+            )
+        header = (
+            "<tr><th>#</th><th>Code</th><th>Course</th><th>Grade</th><th>Status</th><th>Session</th>"
+            "<th>Credits</th></tr>"
+        )
+        return table_page("My Course", "tblGridViewComplete", header, rows)
+
+    def attendance_page(username):
+        rng = random.Random("attendance:" + username)
+        rows = []
+        for i in range(attendance_rows):
+            total = rng.randint(20, 60)
+            attended = rng.randint(int(total * 0.6), total)
+            rows.append(
+                "<tr><td>%d</td><td>CS%04d</td><td>%s</td><td>%d</td><td>%d</td><td>%d</td><td>0</td>"
+                "<td>%.2f%%</td></tr>" % (
+                    i + 1, rng.randint(1000, 9999), rng.choice(SUBJECTS), attended, total - attended, total,
+                    attended * 100.0 / total,
+                )
+            )
+        header = (
+            "<tr><th>#</th><th>Code</th><th>Course</th><th>Attended</th><th>Absent</th><th>Total</th>"
+            "<th>OD</th><th>Percentage</th></tr>"
+        )
+        return table_page("Attendance", "tblStudent", header, rows)
+
+    def table_page(title, table_id, header, rows):
+        if render == "script":
+            body = '<table id="%s">%s</table>' % (table_id, header)
+            return page(title, body, tables={table_id: rows})
+        return page(title, '<table id="%s">%s%s</table>' % (table_id, header, "".join(rows)))
+
+    @app.route("/assets/<name>")
+    def asset(name):
+        count("asset")
+        mimetypes = {"css": "text/css", "js": "application/javascript", "woff2": "font/woff2", "jpg": "image/jpeg"}
+        mimetype = mimetypes.get(name.rsplit(".", 1)[-1], "application/octet-stream")
+        if mimetype in ("text/css", "application/javascript"):
+            return Response("/*" + "x" * (asset_kb * 1024) + "*/", mimetype=mimetype)
+        return Response(b"\0" * (asset_kb * 1024), mimetype=mimetype)
+
+    @app.route("/__stats")
+    def mock_stats():
+        with lock:
+            return jsonify(dict(stats, live_sessions=len(sessions)))
+
+    @app.route("/__expire", methods=["POST"])
+    def expire():
+        with lock:
+            expired = len(sessions)
+            sessions.clear()
+        return jsonify({"expired": expired})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--latency-ms", type=float, default=100, help="added to every portal page")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="random +/- added to the latency")
+    parser.add_argument("--login-latency-ms", type=float, default=300, help="extra latency of the login page")
+    parser.add_argument("--courses", type=int, default=40, help="rows in tblGridViewComplete")
+    parser.add_argument("--attendance-rows", type=int, default=8, help="rows in tblStudent")
+    parser.add_argument("--session-ttl", type=int, default=1200, help="idle seconds before a session expires (0 = never)")
+    parser.add_argument("--render", choices=("server", "script"), default="server")
+    parser.add_argument("--render-delay-ms", type=int, default=300, help="client-side render delay with --render script")
+    parser.add_argument("--reject-password", default="wrong", help="password that fails to log in")
+    parser.add_argument("--asset-kb", type=int, default=64, help="size of each css/js/font/image asset")
+    args = parser.parse_args()
+
+    app = create_app(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, login_latency_ms=args.login_latency_ms,
+        courses=args.courses, attendance_rows=args.attendance_rows, session_ttl=args.session_ttl,
+        render=args.render, render_delay_ms=args.render_delay_ms, reject_password=args.reject_password,
+        asset_kb=args.asset_kb,
+    )
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
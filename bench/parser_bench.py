@@ -0,0 +1,281 @@
+"""Parser regression checks and micro-benchmarks over recorded ARMS pages.
+
+``bench/fixtures`` holds anonymised HTML of each ARMS page, named by page:
+``profile*``, ``mycourse*`` (including a 72-course transcript, malformed
+rows and the login page ARMS serves once a session expired),
+``attendance*`` and ``login*``. Every fixture is run through the same
+extraction the scrapers use (``arms_parser``, then grade points, SGPA/CGPA
+and attendance arithmetic) and compared with ``<fixture>.expected.json``;
+then the parse alone is timed and its peak memory measured with tracemalloc.
+
+The Selenium engine's default extraction (``SELENIUM_PARSE_MODE=script``)
+runs ``page_specs.EXTRACT_JS`` in the browser instead of ``arms_parser``.
+When Chrome is installed, each page fixture is also loaded in headless
+Chrome and the in-page extraction compared with ``arms_parser``'s;
+``--browser off`` skips that, ``--browser require`` fails without Chrome.
+
+    python bench/parser_bench.py                 # check and benchmark, JSON report on stdout
+    python bench/parser_bench.py --check-only    # correctness only
+    python bench/parser_bench.py --update        # rewrite the expected files after an intended change
+
+Exits 1 when an extraction differs from its expected file or the browser's,
+or with
+``--baseline old.json`` when the median parse time or peak memory of a
+fixture regress by more than ``--max-regression``.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import timeit
+import tracemalloc
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import arms_parser  # noqa: E402
+import attendance_math  # noqa: E402
+import gpa  # noqa: E402
+import grading  # noqa: E402
+import page_specs  # noqa: E402
+
+FIXTURES = os.path.join(REPO, "bench", "fixtures")
+# Fixed rather than read from config so the expected files don't depend on the environment
+SCHEME = grading.load("default")
+THRESHOLDS = (75, 80, 85)
+PAGE_URL = "https://arms.example.edu/StudentPortal/DataProfile.aspx"
+
+PARSERS = {
+    "profile": lambda html: arms_parser.parse_profile(html, PAGE_URL),
+    "mycourse": arms_parser.parse_grades,
+    "attendance": arms_parser.parse_attendance,
+    "login": arms_parser.parse_login_form,
+}
+
+# Pages the Selenium engine reads with EXTRACT_JS
+SPECS = {
+    "profile": page_specs.PROFILE,
+    "mycourse": page_specs.GRADES,
+    "attendance": page_specs.ATTENDANCE,
+}
+
+
+def extract(kind, html):
+    """What the scrapers make of a page: parsed fields plus the computed payload fields."""
+    parsed = PARSERS[kind](html)
+    if kind == "mycourse" and parsed is not None:
+        # As scraper.compute_grades
+        courses, arrears = SCHEME.apply(parsed)
+        return dict(gpa.summarize(courses), rows=parsed, courses=courses, arrears=arrears)
+    if kind == "attendance" and parsed is not None:
+        return {"rows": parsed, "attendance": attendance_math.annotate(parsed, THRESHOLDS)}
+    if kind == "login":
+        action, inputs = parsed
+        return {"action": action, "inputs": inputs}
+    return parsed
+
+
+def fixture_kind(path):
+    return os.path.basename(path).split(".")[0].split("_")[0]
+
+
+def first_difference(expected, actual, path="$"):
+    """Where ``actual`` first differs from ``expected`` (None if equal)."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in sorted(set(expected) | set(actual)):
+            if key not in actual:
+                return "%s.%s missing" % (path, key)
+            if key not in expected:
+                return "%s.%s unexpected" % (path, key)
+            difference = first_difference(expected[key], actual[key], "%s.%s" % (path, key))
+            if difference:
+                return difference
+        return None
+    if isinstance(expected, list) and isinstance(actual, list):
+        for index, (old, new) in enumerate(zip(expected, actual)):
+            difference = first_difference(old, new, "%s[%d]" % (path, index))
+            if difference:
+                return difference
+        if len(expected) != len(actual):
+            return "%s has %d items, expected %d" % (path, len(actual), len(expected))
+        return None
+    if expected != actual:
+        return "%s is %r, expected %r" % (path, actual, expected)
+    return None
+
+
+def check(path, update=False):
+    """Compare the extraction of one fixture with its expected file; returns a problem or None."""
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    # Round-trip through JSON so tuples and ints compare like the stored file
+    actual = json.loads(json.dumps(extract(fixture_kind(path), html)))
+    expected_path = path[:-len(".html")] + ".expected.json"
+    if update:
+        with open(expected_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(actual, indent=2, sort_keys=True) + "\n")
+        return None
+    if not os.path.exists(expected_path):
+        return "no %s (run with --update)" % os.path.basename(expected_path)
+    with open(expected_path, encoding="utf-8") as f:
+        expected = json.load(f)
+    return first_difference(expected, actual)
+
+
+def launch_browser():
+    """Headless Chrome configured as the Selenium engine's, or None (with the reason) without one."""
+    try:
+        import chromedriver
+        if chromedriver.chrome_major_version() is None:
+            return None, "Chrome is not installed"
+        from selenium_engine import launch_driver
+        return launch_driver(), None
+    except Exception as e:
+        return None, "could not start Chrome: %s" % e
+
+
+def browser_check(driver, path):
+    """Compare EXTRACT_JS in ``driver`` with arms_parser on one fixture; returns a problem or None."""
+    spec = SPECS[fixture_kind(path)]
+    driver.get("file://" + os.path.abspath(path))
+    result = driver.execute_async_script(page_specs.EXTRACT_JS, spec.compiled)
+    browser = result["data"] if result["status"] == "ok" else result["status"]
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    parsed = "expired" if arms_parser.is_login_page(html) else arms_parser.parse_spec(spec, html, driver.current_url)
+    # Round-trip through JSON so ints and floats compare like the browser's numbers
+    difference = first_difference(json.loads(json.dumps(parsed)), browser)
+    return difference and "browser extraction differs from arms_parser: " + difference
+
+
+def benchmark(path, repeat, min_time):
+    """Parse time (ms per parse) and tracemalloc peak (KiB) for one fixture."""
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    parse = PARSERS[fixture_kind(path)]
+
+    # Enough parses per run that one run takes at least min_time seconds
+    number = 1
+    while timeit.timeit(lambda: parse(html), number=number) < min_time:
+        number *= 2
+    runs = [elapsed / number * 1000 for elapsed in timeit.repeat(lambda: parse(html), number=number, repeat=repeat)]
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = parse(html)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    rows = result["rows"] if isinstance(result, dict) and "rows" in result else result
+    return {
+        "bytes": len(html.encode("utf-8")),
+        "rows": len(rows) if isinstance(rows, list) else None,
+        "parses_per_run": number,
+        "min_ms": round(min(runs), 4),
+        "median_ms": round(statistics.median(runs), 4),
+        "peak_kib": round((peak - before) / 1024, 1),
+        "retained_kib": round((retained - before) / 1024, 1),
+    }
+
+
+def compare(report, baseline, max_regression):
+    """Regressions of ``report`` against ``baseline`` beyond ``max_regression`` (a fraction)."""
+    problems = []
+    for name, new in sorted(report["fixtures"].items()):
+        old = baseline.get("fixtures", {}).get(name)
+        if not old or "median_ms" not in new or "median_ms" not in old:
+            continue
+        for key, unit in (("median_ms", "ms"), ("peak_kib", "KiB")):
+            if old[key] and new[key] > old[key] * (1 + max_regression):
+                problems.append("%s %s %.3f%s -> %.3f%s" % (name, key, old[key], unit, new[key], unit))
+    return problems
+
+
+def check_fixture(path, args, driver, report):
+    name = os.path.basename(path)
+    problem = check(path, args.update)
+    if problem is None and driver is not None and fixture_kind(path) in SPECS:
+        problem = browser_check(driver, path)
+    entry = report["fixtures"][name] = {"kind": fixture_kind(path), "ok": problem is None}
+    if problem:
+        entry["problem"] = problem
+        report["failed"].append(name)
+        print("MISMATCH: %s: %s" % (name, problem), file=sys.stderr)
+    if not args.check_only and not args.update:
+        entry.update(benchmark(path, args.repeat, args.min_time))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--fixtures", default=FIXTURES, help="directory of *.html fixtures")
+    parser.add_argument("--check-only", action="store_true", help="skip the benchmarks")
+    parser.add_argument("--update", action="store_true", help="rewrite the expected files from the current parsers")
+    parser.add_argument("--repeat", type=int, default=7, help="timed runs per fixture")
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per timed run")
+    parser.add_argument("--output", default=None, help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="earlier report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed time/memory regression (0.25 = 25%%)")
+    parser.add_argument("--browser", choices=("auto", "require", "off"), default="auto",
+                        help="compare EXTRACT_JS in headless Chrome with arms_parser (auto: when Chrome is installed)")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+    if not paths:
+        sys.exit("No fixtures in %s" % args.fixtures)
+    unknown = [os.path.basename(path) for path in paths if fixture_kind(path) not in PARSERS]
+    if unknown:
+        sys.exit("Fixtures named after no known page (%s): %s" % (", ".join(PARSERS), ", ".join(unknown)))
+
+    driver = None
+    if args.browser != "off" and not args.update:
+        driver, reason = launch_browser()
+        if driver is None:
+            if args.browser == "require":
+                sys.exit("Browser check required but %s" % reason)
+            print("Skipping the browser check: %s" % reason, file=sys.stderr)
+
+    report = {"fixtures": {}, "failed": [], "browser_checked": driver is not None}
+    try:
+        for path in paths:
+            check_fixture(path, args, driver, report)
+    finally:
+        if driver is not None:
+            driver.quit()
+            import chromedriver
+            chromedriver.shared_service.stop()
+
+    if args.update:
+        print("Rewrote the expected files of %d fixtures" % len(paths), file=sys.stderr)
+        return
+
+    if not args.check_only:
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        for name, entry in sorted(report["fixtures"].items()):
+            print("%-32s %6d B %4s rows  median %8.3f ms  peak %8.1f KiB" % (
+                name, entry["bytes"], entry["rows"] if entry["rows"] is not None else "-",
+                entry["median_ms"], entry["peak_kib"],
+            ), file=sys.stderr)
+    print("%d/%d fixtures match their expected output" % (len(paths) - len(report["failed"]), len(paths)),
+          file=sys.stderr)
+
+    problems = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.max_regression)
+        for problem in problems:
+            print("REGRESSION: " + problem, file=sys.stderr)
+    if report["failed"] or problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
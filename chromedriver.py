@@ -0,0 +1,281 @@
+"""The chromedriver binary and the chromedriver process drivers talk to.
+
+The binary is located once per process at startup. Order:
+``CHROMEDRIVER_PATH`` (a pinned binary, for offline deployments), then
+``chromedriver`` on PATH if its major version matches the installed Chrome,
+then a download through webdriver-manager (unless ``CHROMEDRIVER_DOWNLOAD``
+is off). ``resolve()`` raises ``DriverNotFound`` when none works, so a
+misconfigured worker fails at boot instead of on the first login.
+
+chromedriver serves any number of browser sessions, so by default
+(``CHROMEDRIVER_SHARED``) every driver of a process connects to one
+long-lived ``shared_service`` instead of starting a chromedriver of its own.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import urllib.request
+
+from selenium.webdriver.chrome.service import Service
+
+import config
+import metrics
+from readiness import timed
+
+logger = logging.getLogger(__name__)
+
+CHROME_BINARIES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+_VERSION_PATTERN = re.compile(r"(\d+)\.\d+")
+
+# Seconds the /status health check may take
+STATUS_TIMEOUT = 5
+# Consecutive failed /status checks before a running chromedriver is restarted
+FAILURES_BEFORE_RESTART = 3
+
+RESTARTS = metrics.REGISTRY.counter(
+    "arms_chromedriver_restarts_total", "Restarts of the shared chromedriver after a failed health check"
+)
+
+_path = None
+_lock = threading.Lock()
+
+
+class DriverNotFound(RuntimeError):
+    """No usable chromedriver binary could be found or installed."""
+
+
+def resolve():
+    """Path of the chromedriver binary, looked up on the first call only."""
+    global _path
+    with _lock:
+        if _path is None:
+            with timed(None, "driver:resolve"):
+                _path = _find()
+        return _path
+
+
+def _find():
+    chrome = chrome_major_version()
+
+    if config.CHROMEDRIVER_PATH:
+        path = config.CHROMEDRIVER_PATH
+        version = _major_version(path)
+        if version is None:
+            raise DriverNotFound("CHROMEDRIVER_PATH %s is not a working chromedriver" % path)
+        if chrome is not None and version != chrome:
+            logger.warning("CHROMEDRIVER_PATH is chromedriver %s but Chrome is %s", version, chrome)
+        logger.info("Using chromedriver %s from CHROMEDRIVER_PATH (%s)", version, path)
+        return path
+
+    path = shutil.which("chromedriver")
+    if path is not None:
+        version = _major_version(path)
+        if version is not None and (chrome is None or version == chrome):
+            logger.info("Using chromedriver %s from PATH (%s)", version, path)
+            return path
+        logger.warning("Ignoring %s: chromedriver %s does not match Chrome %s", path, version, chrome)
+
+    if not config.CHROMEDRIVER_DOWNLOAD:
+        raise DriverNotFound(
+            "No matching chromedriver on PATH; set CHROMEDRIVER_PATH or enable CHROMEDRIVER_DOWNLOAD"
+        )
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+    except Exception as e:
+        raise DriverNotFound("Could not install chromedriver through webdriver-manager: %s" % e) from e
+    logger.info("Using chromedriver from webdriver-manager (%s)", path)
+    return path
+
+
+def chrome_major_version():
+    """Major version of the installed Chrome/Chromium, or None if it cannot be found."""
+    for name in CHROME_BINARIES:
+        path = shutil.which(name)
+        if path is not None:
+            return _major_version(path)
+    return None
+
+
+def _major_version(path):
+    if not (os.path.isfile(path) and os.access(path, os.X_OK)):
+        return None
+    try:
+        output = subprocess.run(
+            [path, "--version"], capture_output=True, text=True, timeout=15, check=False
+        ).stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning("Could not run %s --version: %s", path, e)
+        return None
+    match = _VERSION_PATTERN.search(output)
+    return int(match.group(1)) if match else None
+
+
+class SharedService:
+    """One chromedriver process shared by every driver of this process.
+
+    ``url()`` starts it (idempotent) and restarts it when its process has
+    exited. The monitor thread also checks ``/status`` in the background and
+    restarts a chromedriver that fails ``FAILURES_BEFORE_RESTART`` checks in
+    a row, so one slow answer does not kill every browser. Drivers started
+    before a restart lose their browser session: idle ones are dropped by the
+    pool's liveness probe, and ``on_restart`` callbacks drop the rest.
+    """
+
+    def __init__(self):
+        self._service = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._monitor = None
+        self._failures = 0
+        self._callbacks = []
+        self.restarts = 0
+
+    def url(self):
+        """Address of the running chromedriver, starting or restarting it if needed."""
+        with self._lock:
+            replaced = False
+            if not self._running():
+                replaced = self._restart()
+            service_url = self._service.service_url
+        if replaced:
+            self._notify()
+        return service_url
+
+    def attach(self):
+        """A ``Service`` stand-in that points a new driver at the shared chromedriver."""
+        return _Attached(resolve(), self.url())
+
+    def healthy(self):
+        with self._lock:
+            return self._healthy()
+
+    def on_restart(self, callback):
+        """Call ``callback()`` after every restart of a chromedriver that was running."""
+        self._callbacks.append(callback)
+
+    def start_monitor(self, interval):
+        """Health-check every ``interval`` seconds in the background (idempotent; 0 disables)."""
+        with self._lock:
+            if self._monitor is not None or interval <= 0:
+                return
+            self._stopping.clear()
+            self._monitor = threading.Thread(
+                target=self._monitor_loop, args=(interval,), name="chromedriver-monitor", daemon=True
+            )
+            self._monitor.start()
+
+    def stop(self):
+        """Stop the monitor and the chromedriver process (idempotent)."""
+        self._stopping.set()
+        with self._lock:
+            self._monitor = None
+            self._stop_service()
+
+    def stats(self):
+        with self._lock:
+            service = self._service
+            running = self._running()
+            return {
+                "running": running,
+                "pid": service.process.pid if running else None,
+                "url": service.service_url if service is not None else None,
+                "restarts": self.restarts,
+                "failed_checks": self._failures,
+            }
+
+    def _monitor_loop(self, interval):
+        while not self._stopping.wait(interval):
+            replaced = False
+            with self._lock:
+                # stop() may have run while we waited for the lock
+                if self._stopping.is_set():
+                    continue
+                # An exited process is restarted straight away, a slow one after repeated failures
+                if self._running():
+                    if self._healthy():
+                        self._failures = 0
+                        continue
+                    self._failures += 1
+                    if self._failures < FAILURES_BEFORE_RESTART:
+                        continue
+                try:
+                    replaced = self._restart()
+                except Exception as e:
+                    logger.error("Could not restart the shared chromedriver: %s", e)
+            if replaced:
+                self._notify()
+
+    def _running(self):
+        service = self._service
+        return service is not None and service.process is not None and service.process.poll() is None
+
+    def _healthy(self):
+        if not self._running():
+            return False
+        service = self._service
+        try:
+            with urllib.request.urlopen(service.service_url + "/status", timeout=STATUS_TIMEOUT) as response:
+                return bool(json.load(response).get("value", {}).get("ready", True))
+        except (OSError, ValueError) as e:
+            logger.warning("Shared chromedriver health check failed: %s", e)
+            return False
+
+    def _restart(self):
+        """(Re)start chromedriver; True when a previous one was replaced. Caller holds the lock."""
+        replaced = self._service is not None
+        if replaced:
+            logger.warning("Shared chromedriver is not healthy, restarting it")
+            self._stop_service()
+            self.restarts += 1
+            RESTARTS.inc()
+        self._failures = 0
+        with timed(None, "driver:service"):
+            service = Service(executable_path=resolve())
+            service.start()
+        self._service = service
+        logger.info("Shared chromedriver (pid %s) listening on %s", service.process.pid, service.service_url)
+        return replaced
+
+    def _notify(self):
+        # Outside the lock: callbacks may quit drivers, which can call url()
+        for callback in self._callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error("chromedriver restart callback failed: %s", e)
+
+    def _stop_service(self):
+        if self._service is None:
+            return
+        try:
+            self._service.stop()
+        except Exception as e:
+            logger.warning("Could not stop the shared chromedriver: %s", e)
+        self._service = None
+
+
+class _Attached:
+    """Stands in for a per-driver ``Service``: the driver connects to the shared
+    chromedriver, and quitting the driver leaves that chromedriver running."""
+
+    def __init__(self, path, service_url):
+        self.path = path
+        self.service_url = service_url
+
+    def env_path(self):
+        return None
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+shared_service = SharedService()
@@ -0,0 +1,163 @@
+import json
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError("%s must be an integer, got %r" % (name, value))
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_list(name):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _env_percentages(name, default):
+    values = []
+    for item in _env_list(name) or default:
+        try:
+            value = float(item)
+        except ValueError:
+            raise ValueError("%s must be comma-separated percentages, got %r" % (name, item))
+        if not 0 < value <= 100:
+            raise ValueError("%s entries must be above 0 and at most 100, got %r" % (name, item))
+        values.append(int(value) if value.is_integer() else value)
+    return values
+
+
+def _env_json(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return json.loads(value)
+    except ValueError:
+        raise ValueError("%s must be valid JSON, got %r" % (name, value))
+
+
+# ARMS portal root; point at bench/mock_arms.py for offline benchmarks
+ARMS_BASE_URL = os.environ.get("ARMS_BASE_URL", "https://arms.sse.saveetha.com").rstrip("/")
+
+# Scraper engine used for new logins: "selenium" (headless Chrome) or "http"
+# (requests + ASP.NET form posts, no browser). With SCRAPER_FALLBACK the http
+# engine falls back to Selenium for pages it cannot read.
+SCRAPER_ENGINE = os.environ.get("SCRAPER_ENGINE", "selenium").strip().lower()
+SCRAPER_FALLBACK = _env_bool("SCRAPER_FALLBACK", True)
+if SCRAPER_ENGINE not in ("selenium", "http"):
+    raise ValueError("SCRAPER_ENGINE must be 'selenium' or 'http', got %r" % SCRAPER_ENGINE)
+
+# chromedriver for the Selenium engine (see chromedriver.py), resolved once at startup:
+# CHROMEDRIVER_PATH     - pinned binary, used as is (offline deployments)
+# CHROMEDRIVER_DOWNLOAD - without a pinned path or a matching chromedriver on PATH,
+#                         install one through webdriver-manager; off fails startup instead
+CHROMEDRIVER_PATH = os.environ.get("CHROMEDRIVER_PATH", "").strip()
+CHROMEDRIVER_DOWNLOAD = _env_bool("CHROMEDRIVER_DOWNLOAD", True)
+# CHROMEDRIVER_SHARED          - all drivers of a process use one chromedriver instead of one each
+# CHROMEDRIVER_HEALTH_INTERVAL - seconds between health checks of the shared chromedriver (0 disables)
+CHROMEDRIVER_SHARED = _env_bool("CHROMEDRIVER_SHARED", True)
+CHROMEDRIVER_HEALTH_INTERVAL = _env_int("CHROMEDRIVER_HEALTH_INTERVAL", 30)
+
+# How the Selenium engine reads a page once it is ready: "script" extracts the
+# fields in the browser; "html" takes one snapshot of the page and parses it
+# in Python with arms_parser (the parser the http engine uses), on a worker
+# thread so the browser can move on to the next tab meanwhile
+SELENIUM_PARSE_MODE = os.environ.get("SELENIUM_PARSE_MODE", "script").strip().lower()
+if SELENIUM_PARSE_MODE not in ("script", "html"):
+    raise ValueError("SELENIUM_PARSE_MODE must be 'script' or 'html', got %r" % SELENIUM_PARSE_MODE)
+
+# Requests Chrome blocks on ARMS pages (see resource_filter.py)
+# RESOURCE_BLOCKING       - block fonts, images, stylesheets, media and analytics through DevTools
+# RESOURCE_BLOCK_PATTERNS - comma-separated URL patterns ('*' wildcard) replacing the default block list
+# RESOURCE_PAGE_RULES     - JSON per-page rules, e.g. {"DataProfile.aspx": {"allow": ["*.jpg*"], "block": ["*chat*"]}}
+RESOURCE_BLOCKING = _env_bool("RESOURCE_BLOCKING", True)
+RESOURCE_BLOCK_PATTERNS = _env_list("RESOURCE_BLOCK_PATTERNS")
+RESOURCE_PAGE_RULES = _env_json("RESOURCE_PAGE_RULES", {})
+if not isinstance(RESOURCE_PAGE_RULES, dict):
+    raise ValueError("RESOURCE_PAGE_RULES must be a JSON object keyed by page name")
+
+# Optional scraper service (see scraper_service.py). When SCRAPER_SERVICE_ADDRESS
+# (a Unix socket path) is set, the web app forwards scrapes to the service and
+# runs no browsers itself; the pool and session settings below then apply per
+# service worker.
+# SCRAPER_SERVICE_WORKERS - browser worker processes; each user is pinned to one
+# SCRAPER_SERVICE_THREADS - concurrent scrapes per worker process
+# SCRAPER_SERVICE_AUTHKEY - shared secret for the socket handshake, also between web workers (optional)
+SCRAPER_SERVICE_ADDRESS = os.environ.get("SCRAPER_SERVICE_ADDRESS", "").strip()
+SCRAPER_SERVICE_WORKERS = _env_int("SCRAPER_SERVICE_WORKERS", 2)
+SCRAPER_SERVICE_THREADS = _env_int("SCRAPER_SERVICE_THREADS", 8)
+SCRAPER_SERVICE_AUTHKEY = os.environ.get("SCRAPER_SERVICE_AUTHKEY", "").encode("utf-8") or None
+
+# Sticky sessions between gunicorn workers (see session_registry.py). When
+# SESSION_REGISTRY_DIR is set and no scraper service is used, each worker
+# registers the users whose sessions it holds there and forwards requests for
+# users owned by another worker to that worker's socket in the same directory.
+SESSION_REGISTRY_DIR = os.environ.get("SESSION_REGISTRY_DIR", "").strip()
+
+# Warm pool of pre-launched Chrome drivers (see driver_pool.py)
+# DRIVER_POOL_SIZE     - number of idle drivers the refill thread tops the pool up to
+# DRIVER_POOL_MIN_IDLE - refill is triggered when idle drivers drop below this (0 disables refill)
+# DRIVER_POOL_MAX_TOTAL - hard cap on idle + handed out drivers in this worker
+DRIVER_POOL_SIZE = _env_int("DRIVER_POOL_SIZE", 2)
+DRIVER_POOL_MIN_IDLE = _env_int("DRIVER_POOL_MIN_IDLE", 1)
+DRIVER_POOL_MAX_TOTAL = _env_int("DRIVER_POOL_MAX_TOTAL", 8)
+# Seconds a login waits for a driver when the pool is at DRIVER_POOL_MAX_TOTAL
+DRIVER_POOL_ACQUIRE_TIMEOUT = _env_int("DRIVER_POOL_ACQUIRE_TIMEOUT", 30)
+
+# Logged-in sessions kept per worker (see session_store.py)
+# SESSION_MAX_LIVE      - hard cap on logged-in browsers; the least recently used one is quit beyond it
+# SESSION_IDLE_TTL      - seconds a session may sit unused before it is quit (0 keeps sessions forever)
+# SESSION_REAP_INTERVAL - seconds between reaper sweeps for idle sessions
+SESSION_MAX_LIVE = _env_int("SESSION_MAX_LIVE", 6)
+SESSION_IDLE_TTL = _env_int("SESSION_IDLE_TTL", 900)
+SESSION_REAP_INTERVAL = _env_int("SESSION_REAP_INTERVAL", 30)
+# Sessions used within SESSION_HOT_WINDOW seconds are probed every
+# SESSION_KEEPALIVE_INTERVAL seconds (0 disables) to keep them logged in on
+# ARMS and drop the ones that expired anyway
+SESSION_KEEPALIVE_INTERVAL = _env_int("SESSION_KEEPALIVE_INTERVAL", 240)
+SESSION_HOT_WINDOW = _env_int("SESSION_HOT_WINDOW", 600)
+
+# Saved ARMS cookies per user (see cookie_store.py) so a restart resumes
+# sessions instead of logging every student in again
+# COOKIE_STORE_DIR - directory of the per-user JSON cookie files (empty disables persistence)
+# COOKIE_STORE_TTL - seconds saved cookies are tried before a fresh login is required
+COOKIE_STORE_DIR = os.environ.get(
+    "COOKIE_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cookies")
+).strip()
+COOKIE_STORE_TTL = _env_int("COOKIE_STORE_TTL", 21600)
+
+# Background scrape jobs submitted through POST /jobs (see jobs.py)
+# JOB_WORKERS     - scrapes run concurrently per worker process
+# JOB_MAX_PENDING - queued + running jobs accepted before /jobs answers 503
+# JOB_TTL         - seconds a finished job's result stays available
+JOB_WORKERS = _env_int("JOB_WORKERS", 4)
+JOB_MAX_PENDING = _env_int("JOB_MAX_PENDING", 100)
+JOB_TTL = _env_int("JOB_TTL", 600)
+
+# Grade points (see grading.py): GRADING_SCHEME names a built-in scheme or one
+# from the JSON file GRADING_SCHEMES_FILE; every scheme is validated at startup
+GRADING_SCHEME = os.environ.get("GRADING_SCHEME", "default").strip()
+GRADING_SCHEMES_FILE = os.environ.get("GRADING_SCHEMES_FILE", "").strip()
+
+# Attendance targets (percent) reported per course under "targets"; the
+# safe_leave_days / classes_needed_for_80 fields the UI shows stay at 80%
+ATTENDANCE_THRESHOLDS = _env_percentages("ATTENDANCE_THRESHOLDS", ["75", "80", "85"])
+
+# Per-user result cache (see result_cache.py); a TTL of 0 disables caching of that payload
+RESULT_CACHE_GRADES_TTL = _env_int("RESULT_CACHE_GRADES_TTL", 600)
+RESULT_CACHE_ATTENDANCE_TTL = _env_int("RESULT_CACHE_ATTENDANCE_TTL", 300)
+RESULT_CACHE_DASHBOARD_TTL = _env_int("RESULT_CACHE_DASHBOARD_TTL", 300)
+RESULT_CACHE_MAX_ENTRIES = _env_int("RESULT_CACHE_MAX_ENTRIES", 1000)
@@ -0,0 +1,97 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+# PBKDF2 rounds for the password hash kept with the cookies
+HASH_ITERATIONS = 100000
+
+
+class CookieStore:
+    """Persists ARMS session cookies per user as JSON files.
+
+    Files live in ``directory`` (created 0700, files written 0600 and
+    atomically replaced) under a hash of the username. A file older than
+    ``ttl`` seconds, and any cookie past its own expiry, is ignored. Cookies
+    are plain dicts in Selenium's format: ``name``, ``value``, ``domain``,
+    ``path``, ``secure``, ``httpOnly`` and an optional ``expiry`` (epoch
+    seconds).
+
+    Each file also keeps a salted hash of the password the session was
+    logged in with; ``load`` only hands the cookies back to a caller that
+    presents the same password.
+    """
+
+    def __init__(self, directory, ttl=21600):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def save(self, username, password, cookies):
+        salt = os.urandom(16)
+        record = {
+            "username": username,
+            "saved": time.time(),
+            "salt": salt.hex(),
+            "credential": _hash_password(password, salt),
+            "cookies": cookies,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(record, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self._path(username))
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def load(self, username, password):
+        """Return the unexpired cookies saved for ``username``, or None (also
+        when ``password`` is missing or not the one they were saved with)."""
+        if not password:
+            return None
+        path = self._path(username)
+        try:
+            with open(path) as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable cookie file for user %s: %s", username, e)
+            self.delete(username)
+            return None
+
+        now = time.time()
+        if (record.get("username") != username or now - record.get("saved", 0) > self.ttl
+                or not record.get("salt") or not record.get("credential")):
+            self.delete(username)
+            return None
+        credential = _hash_password(password, bytes.fromhex(record["salt"]))
+        if not hmac.compare_digest(credential, record["credential"]):
+            logger.warning("Password does not match the saved cookies of user %s", username)
+            return None
+        cookies = [c for c in record.get("cookies", []) if not c.get("expiry") or c["expiry"] > now]
+        return cookies or None
+
+    def delete(self, username):
+        try:
+            os.unlink(self._path(username))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, username):
+        digest = hashlib.sha256(username.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + ".json")
+
+
+def _hash_password(password, salt):
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, HASH_ITERATIONS).hex()
@@ -0,0 +1,151 @@
+import collections
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhausted(Exception):
+    """Raised when no driver could be handed out within the acquire timeout."""
+
+
+class DriverPool:
+    """Keeps pre-launched, already configured webdriver instances ready.
+
+    ``factory`` launches one driver. Idle drivers are handed out by
+    ``acquire()``; a driver that is no longer needed must be given back through
+    ``discard()`` which quits it and frees its slot. Drivers are never returned
+    to the idle set because they carry the cookies of whoever logged in on them.
+    """
+
+    def __init__(self, factory, size=2, min_idle=1, max_total=8, acquire_timeout=30):
+        self.factory = factory
+        self.max_total = max(1, max_total)
+        self.size = min(max(size, min_idle, 0), self.max_total)
+        self.min_idle = min(max(min_idle, 0), self.size)
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = collections.deque()
+        # Idle + handed out + currently launching drivers
+        self._total = 0
+        self._cond = threading.Condition()
+        self._refill_needed = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        """Start the background refill thread (idempotent)."""
+        with self._cond:
+            if self._thread is not None or self.size == 0:
+                return
+            self._thread = threading.Thread(target=self._refill_loop, name="driver-pool-refill", daemon=True)
+            self._thread.start()
+        self._refill_needed.set()
+
+    def acquire(self):
+        """Hand out a ready driver, launching one inline if none is idle."""
+        deadline = time.time() + self.acquire_timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._total >= self.max_total:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise PoolExhausted("All %d drivers are in use" % self.max_total)
+                    self._cond.wait(remaining)
+                driver = self._idle.popleft() if self._idle else None
+                if driver is None:
+                    self._total += 1
+            self._refill_needed.set()
+
+            if driver is None:
+                logger.info("Driver pool empty, launching a driver inline")
+                return self._launch()
+            if self._is_alive(driver):
+                return driver
+            logger.warning("Discarding dead idle driver from pool")
+            self.discard(driver)
+
+    def discard(self, driver):
+        """Quit a driver handed out by this pool and free its slot."""
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self._cond:
+            self._total = max(0, self._total - 1)
+            self._cond.notify()
+        self._refill_needed.set()
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "idle": idle,
+                "in_use": self._total - idle,
+                "total": self._total,
+                "size": self.size,
+                "min_idle": self.min_idle,
+                "max_total": self.max_total,
+            }
+
+    def shutdown(self):
+        """Stop refilling and quit every idle driver."""
+        with self._cond:
+            self._stopped = True
+            idle = list(self._idle)
+            self._idle.clear()
+        self._refill_needed.set()
+        for driver in idle:
+            self.discard(driver)
+
+    def _launch(self):
+        try:
+            return self.factory()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+    def _is_alive(self, driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _refill_loop(self):
+        backoff = 1
+        while True:
+            self._refill_needed.wait(5)
+            self._refill_needed.clear()
+            with self._cond:
+                if self._stopped:
+                    return
+                if len(self._idle) >= self.min_idle:
+                    continue
+            while True:
+                with self._cond:
+                    if self._stopped or len(self._idle) >= self.size or self._total >= self.max_total:
+                        break
+                    self._total += 1
+                try:
+                    driver = self._launch()
+                except Exception as e:
+                    logger.error("Driver pool refill failed, retrying in %ds: %s", backoff, e)
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, 60)
+                    break
+                backoff = 1
+                with self._cond:
+                    if self._stopped:
+                        stopped = True
+                    else:
+                        stopped = False
+                        self._idle.append(driver)
+                        self._cond.notify()
+                if stopped:
+                    self.discard(driver)
+                    return
+                logger.info("Driver pool refilled: %d idle", len(self._idle))
@@ -0,0 +1,18 @@
+class ScrapeError(Exception):
+    """The ARMS page did not look the way the scraper expects."""
+
+
+class LoginFailed(ScrapeError):
+    """ARMS rejected the supplied credentials."""
+
+
+class SessionExpired(ScrapeError):
+    """The stored ARMS session is no longer logged in."""
+
+
+class ServiceError(Exception):
+    """The scraper service was unreachable, or the scrape failed inside it."""
+
+
+class ServiceUnavailable(ServiceError):
+    """The scraper service (or the peer worker) could not be reached."""
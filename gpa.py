@@ -0,0 +1,88 @@
+"""Credit-weighted SGPA per term and cumulative CGPA.
+
+Courses are grouped by the term they were completed in (the ``completed``
+column, e.g. ``"NOV 2023"``). The cumulative CGPA is a running total of the
+terms' credit and grade-point totals in date order.
+"""
+import re
+
+# When ARMS shows no credits at all every course counts as one credit, which
+# makes the CGPA the plain mean of grade points
+DEFAULT_CREDITS = 1
+
+MONTHS = {
+    "JAN": 1, "FEB": 2, "MAR": 3, "APR": 4, "MAY": 5, "JUN": 6,
+    "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DEC": 12,
+}
+
+_TERM_PATTERN = re.compile(r"([A-Za-z]{3})[A-Za-z]*[\s\-/,]*(\d{4})")
+
+
+def parse_term(completed):
+    """``(sort key, label)`` of a ``completed`` value: ``"Nov-2023"`` -> ``((2023, 11, ""), "NOV 2023")``.
+
+    Unparseable values keep their text and sort last.
+    """
+    text = (completed or "").strip()
+    match = _TERM_PATTERN.search(text)
+    if match and match.group(1).upper() in MONTHS:
+        month = match.group(1).upper()
+        return (int(match.group(2)), MONTHS[month], ""), "%s %s" % (month, match.group(2))
+    return (float("inf"), 0, text), text
+
+
+def course_credits(course):
+    """The course's credits, or None when ARMS shows none (blank, "-", negative)."""
+    credits = course.get("credits")
+    if isinstance(credits, bool) or not isinstance(credits, (int, float)) or credits < 0:
+        return None
+    return credits
+
+
+def summarize(courses):
+    """CGPA, total credits and a per-term breakdown of ``courses``.
+
+    Each course needs ``points`` and ``completed``. When no course has
+    credits, each counts as ``DEFAULT_CREDITS``; otherwise courses without
+    credits are left out of the weighting and their codes listed under
+    ``uncredited``. Terms are listed oldest first with their SGPA and the
+    CGPA up to and including that term.
+    """
+    weighted = any(course_credits(course) is not None for course in courses)
+    terms = {}
+    uncredited = []
+    for course in courses:
+        credits = course_credits(course)
+        if credits is None:
+            if weighted:
+                uncredited.append(course.get("code"))
+                credits = 0
+            else:
+                credits = DEFAULT_CREDITS
+        terms.setdefault(parse_term(course.get("completed")), []).append((credits, course["points"]))
+
+    semesters = []
+    total_credits = total_points = 0
+    for (_, term), rows in sorted(terms.items()):
+        credits = sum(row_credits for row_credits, _ in rows)
+        points = sum(row_credits * row_points for row_credits, row_points in rows)
+        total_credits += credits
+        total_points += points
+        semesters.append({
+            "term": term,
+            "courses": len(rows),
+            "credits": credits,
+            # None for a term with nothing to weight (only uncredited courses)
+            "sgpa": _ratio(points, credits) if credits else None,
+            "cgpa": _ratio(total_points, total_credits),
+        })
+    return {
+        "cgpa": _ratio(total_points, total_credits),
+        "total_credits": total_credits,
+        "semesters": semesters,
+        "uncredited": uncredited,
+    }
+
+
+def _ratio(points, credits):
+    return round(points / credits, 2) if credits else 0
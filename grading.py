@@ -0,0 +1,150 @@
+"""Grade-point schemes, applied to the raw MyCourse rows after extraction.
+
+A scheme maps passing grades to points and names the grades that mean a
+failed attempt (``U``, ``RA``), an absence (``AB``) or a withdrawal (``W``).
+The built-in ``default`` scheme is the S..E / 10..5 scale; more schemes can be
+loaded from a JSON file keyed by scheme name::
+
+    {"regulation-2023": {"points": {"O": 10, "A+": 9, "A": 8, "B+": 7, "B": 6, "C": 5},
+                         "fail": ["U", "RA"], "absent": ["AB", "UA"], "withdrawn": ["W"]}}
+
+Schemes are validated when loaded (once, at startup).
+"""
+import json
+import logging
+import numbers
+
+logger = logging.getLogger(__name__)
+
+BUILTIN_SCHEMES = {
+    "default": {
+        "points": {"S": 10, "A": 9, "B": 8, "C": 7, "D": 6, "E": 5},
+        "fail": ["U", "RA"],
+        "absent": ["AB"],
+        "withdrawn": ["W"],
+        "pass_status": ["PASS"],
+    },
+}
+
+PASSED, FAILED, ABSENT, WITHDRAWN, UNKNOWN = "passed", "failed", "absent", "withdrawn", "unknown"
+
+
+class GradingScheme:
+    """A validated grade -> points mapping plus the non-passing grades."""
+
+    def __init__(self, name, points, fail=(), absent=(), withdrawn=(), pass_status=("PASS",)):
+        self.name = name
+        self.points = {_grade(name, grade): _points(name, grade, value) for grade, value in dict(points).items()}
+        if not self.points:
+            raise ValueError("Grading scheme %r maps no grades to points" % name)
+        self.fail = frozenset(_grade(name, grade) for grade in fail)
+        self.absent = frozenset(_grade(name, grade) for grade in absent)
+        self.withdrawn = frozenset(_grade(name, grade) for grade in withdrawn)
+        self.pass_status = frozenset(_grade(name, status) for status in pass_status)
+
+        groups = [set(self.points), self.fail, self.absent, self.withdrawn]
+        seen = set()
+        for group in groups:
+            overlap = seen & group
+            if overlap:
+                raise ValueError("Grading scheme %r lists grades %s twice" % (name, ", ".join(sorted(overlap))))
+            seen |= group
+
+    @classmethod
+    def from_dict(cls, name, spec):
+        if not isinstance(spec, dict) or not isinstance(spec.get("points"), dict):
+            raise ValueError("Grading scheme %r needs a \"points\" object" % name)
+        unknown = set(spec) - {"points", "fail", "absent", "withdrawn", "pass_status"}
+        if unknown:
+            raise ValueError("Grading scheme %r has unknown keys: %s" % (name, ", ".join(sorted(unknown))))
+        return cls(
+            name, spec["points"], spec.get("fail", ()), spec.get("absent", ()), spec.get("withdrawn", ()),
+            spec.get("pass_status", ("PASS",)),
+        )
+
+    def classify(self, grade, status):
+        """``passed``, ``failed``, ``absent``, ``withdrawn`` or ``unknown`` for one attempt."""
+        grade = (grade or "").strip().upper()
+        status = (status or "").strip().upper()
+        if grade in self.withdrawn:
+            return WITHDRAWN
+        if grade in self.absent:
+            return ABSENT
+        if grade in self.fail or status == "FAIL":
+            return FAILED
+        if grade in self.points and status in self.pass_status:
+            return PASSED
+        return UNKNOWN
+
+    def apply(self, rows):
+        """Split raw MyCourse rows into passed courses (with ``points``) and arrears.
+
+        An arrear is a course whose attempts were all failed or absent; a
+        course passed in a later attempt is not one. Each arrear lists its
+        latest attempt and the number of ``attempts``.
+        """
+        courses = []
+        passed_codes = set()
+        attempts = {}
+        for row in rows:
+            outcome = self.classify(row.get("grade"), row.get("status"))
+            if outcome == PASSED:
+                grade = row["grade"].strip().upper()
+                courses.append({
+                    "code": row.get("code"),
+                    "name": row.get("name"),
+                    "grade": grade,
+                    "points": self.points[grade],
+                    "completed": row.get("completed"),
+                    "credits": row.get("credits"),
+                })
+                passed_codes.add(row.get("code"))
+            elif outcome in (FAILED, ABSENT):
+                attempts.setdefault(row.get("code"), []).append(row)
+            elif outcome == UNKNOWN:
+                logger.debug("Skipping course %s with grade %r / status %r", row.get("code"), row.get("grade"), row.get("status"))
+
+        arrears = []
+        for code, failed in attempts.items():
+            if code in passed_codes:
+                continue
+            latest = failed[-1]
+            arrears.append({
+                "code": code,
+                "name": latest.get("name"),
+                "grade": (latest.get("grade") or "").strip().upper(),
+                "completed": latest.get("completed"),
+                "attempts": len(failed),
+            })
+        return courses, arrears
+
+
+def load(name="default", path=None):
+    """The scheme called ``name`` from the built-ins and the optional JSON file at ``path``."""
+    specs = dict(BUILTIN_SCHEMES)
+    if path:
+        try:
+            with open(path) as f:
+                extra = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError("Cannot read grading schemes from %s: %s" % (path, e))
+        if not isinstance(extra, dict):
+            raise ValueError("%s must hold a JSON object keyed by scheme name" % path)
+        specs.update(extra)
+    # Validate every scheme, not just the selected one, so a typo anywhere fails at startup
+    schemes = {scheme_name: GradingScheme.from_dict(scheme_name, spec) for scheme_name, spec in specs.items()}
+    if name not in schemes:
+        raise ValueError("Unknown grading scheme %r (known: %s)" % (name, ", ".join(sorted(schemes))))
+    return schemes[name]
+
+
+def _grade(scheme, grade):
+    if not isinstance(grade, str) or not grade.strip():
+        raise ValueError("Grading scheme %r has an empty or non-string grade: %r" % (scheme, grade))
+    return grade.strip().upper()
+
+
+def _points(scheme, grade, value):
+    if isinstance(value, bool) or not isinstance(value, numbers.Real) or not 0 <= value <= 10:
+        raise ValueError("Grading scheme %r gives grade %r invalid points %r (expected 0-10)" % (scheme, grade, value))
+    return value
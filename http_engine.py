@@ -0,0 +1,191 @@
+"""Browserless ARMS scraper built on requests.Session and ASP.NET form posts."""
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+import arms_parser
+import config
+import metrics
+from errors import LoginFailed, ScrapeError, SessionExpired
+from readiness import timed
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+PROBE_PATH = "/StudentPortal/Landing.aspx"
+
+# Shared by all sessions to fetch independent pages of one user concurrently
+_page_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="arms-http")
+
+
+class HttpSession:
+    """A logged-in ARMS session that talks HTTP directly, without a browser.
+
+    Has the same interface as ``selenium_engine.SeleniumSession`` so both can
+    live in the session store. Pages whose data is only rendered client-side
+    raise ``ScrapeError`` so the caller can fall back to Selenium.
+    """
+
+    engine = "http"
+
+    def __init__(self, base_url=None, timeout=20):
+        self.base_url = base_url or config.ARMS_BASE_URL
+        self.timeout = timeout
+        self.http = requests.Session()
+        self.http.headers["User-Agent"] = USER_AGENT
+        # Seconds spent per page request, reset by the caller per request
+        self.timings = {}
+        # Requests sent per "method:page", reset likewise
+        self.roundtrips = {}
+
+    def login(self, username, password):
+        logger.info("Opening login page over HTTP...")
+        response = self._request("GET", self.base_url + "/")
+        action, inputs = arms_parser.parse_login_form(response.text)
+
+        by_id = {attrs.get("id"): attrs for attrs in inputs}
+        if "txtusername" not in by_id or "txtpassword" not in by_id:
+            raise ScrapeError("Login form not found on %s" % response.url)
+
+        # Round-trip every hidden ASP.NET field (__VIEWSTATE, __EVENTVALIDATION, ...)
+        form = {
+            attrs["name"]: attrs.get("value") or ""
+            for attrs in inputs
+            if attrs.get("name") and (attrs.get("type") or "").lower() == "hidden"
+        }
+        form[by_id["txtusername"].get("name") or "txtusername"] = username
+        form[by_id["txtpassword"].get("name") or "txtpassword"] = password
+        button = by_id.get("btnlogin")
+        if button is not None and button.get("name"):
+            form[button["name"]] = button.get("value") or ""
+        else:
+            form["__EVENTTARGET"] = "btnlogin"
+
+        logger.info("Posting credentials for user: %s", username)
+        response = self._request("POST", urljoin(response.url, action or ""), data=form)
+        if not _on_page(response, "Landing.aspx"):
+            raise LoginFailed("Login failed, please check credentials")
+        logger.info("Login successful. Current URL: %s", response.url)
+
+    def fetch_profile(self):
+        response = self._get_page("/StudentPortal/DataProfile.aspx")
+        with timed(self.timings, "extract:profile"):
+            student_data = arms_parser.parse_profile(response.text, response.url)
+        if not student_data["name"]:
+            raise ScrapeError("Profile fields are not rendered server-side")
+        return student_data
+
+    def fetch_grades(self):
+        response = self._get_page("/StudentPortal/MyCourse.aspx")
+        with timed(self.timings, "extract:grades"):
+            results = arms_parser.parse_grades(response.text)
+        if results is None:
+            raise ScrapeError("Grades table not found in MyCourse.aspx")
+        return results
+
+    def fetch_attendance(self):
+        response = self._get_page("/StudentPortal/AttendanceReport.aspx")
+        with timed(self.timings, "extract:attendance"):
+            attendance_data = arms_parser.parse_attendance(response.text)
+        if attendance_data is None:
+            raise ScrapeError("Attendance table not found in AttendanceReport.aspx")
+        return attendance_data
+
+    def fetch_profile_and_grades(self):
+        """Fetch DataProfile and MyCourse concurrently on the same cookie jar."""
+        grades = _page_executor.submit(self.fetch_grades)
+        try:
+            student_data = self.fetch_profile()
+        except Exception:
+            # Don't hand the session back while the grades request is still running
+            wait([grades])
+            raise
+        return student_data, grades.result()
+
+    def fetch_dashboard(self):
+        """Fetch profile, grades and attendance concurrently."""
+        grades = _page_executor.submit(self.fetch_grades)
+        attendance = _page_executor.submit(self.fetch_attendance)
+        try:
+            student_data = self.fetch_profile()
+        except Exception:
+            wait([grades, attendance])
+            raise
+        try:
+            results = grades.result()
+        except Exception:
+            wait([attendance])
+            raise
+        return student_data, results, attendance.result()
+
+    def is_alive(self):
+        """Cheap liveness probe: the landing page must load without a redirect."""
+        try:
+            response = self.http.get(self.base_url + PROBE_PATH, timeout=self.timeout, allow_redirects=False)
+        except requests.RequestException as e:
+            logger.warning("Session probe failed: %s", e)
+            return False
+        return response.status_code == 200
+
+    def export_cookies(self):
+        """The session cookies in ``cookie_store`` format."""
+        return [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "secure": bool(cookie.secure),
+                "httpOnly": cookie.has_nonstandard_attr("HttpOnly"),
+                "expiry": cookie.expires,
+            }
+            for cookie in self.http.cookies
+        ]
+
+    def restore(self, cookies):
+        """Resume a session from saved cookies instead of logging in; True if still valid."""
+        for cookie in cookies:
+            self.http.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain") or "",
+                path=cookie.get("path") or "/",
+                secure=bool(cookie.get("secure")),
+                expires=cookie.get("expiry"),
+            )
+        return self.is_alive()
+
+    def quit(self):
+        self.http.close()
+
+    def _get_page(self, path):
+        page = path.rsplit("/", 1)[-1]
+        response = self._request("GET", self.base_url + path)
+        # ASP.NET forms auth redirects expired sessions to the login page, with
+        # the requested page in its ReturnUrl query
+        if not _on_page(response, page):
+            raise SessionExpired("Failed to load %s. Possibly logged out." % page)
+        return response
+
+    def _request(self, method, url, **kwargs):
+        label = "%s:%s" % (method.lower(), url.rsplit("/", 1)[-1] or "login")
+        self.roundtrips[label] = self.roundtrips.get(label, 0) + 1
+        metrics.ROUNDTRIPS.inc("http", method.upper())
+        try:
+            with timed(self.timings, label):
+                response = self.http.request(method, url, timeout=self.timeout, **kwargs)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise ScrapeError("HTTP request to %s failed: %s" % (url, e))
+        return response
+
+
+def _on_page(response, page):
+    """Whether ``response`` ended on ``page`` (its URL path, not the query) rather than the login form."""
+    on_page = urlparse(response.url).path.rsplit("/", 1)[-1].lower() == page.lower()
+    return on_page and not arms_parser.is_login_page(response.text)
@@ -0,0 +1,136 @@
+import collections
+import logging
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("done", "failed")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    """A scrape running in the background; ``stage`` and ``status`` change as it runs."""
+
+    def __init__(self, kind, username, id_prefix=""):
+        # Unguessable: the id alone gives access to the result
+        self.id = id_prefix + secrets.token_urlsafe(16)
+        self.kind = kind
+        self.username = username
+        self.status = "queued"
+        self.stage = "queued"
+        self.result = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # Bumped on every change so waiters can tell what they already saw
+        self.version = 0
+
+    def to_dict(self):
+        end = self.finished or time.time()
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "queued_for": round((self.started or end) - self.created, 3),
+            "elapsed": round(end - self.created, 3),
+            "result": self.result,
+        }
+
+
+class JobQueue:
+    """Runs scrape jobs on a bounded thread pool and keeps their results for ``ttl`` seconds.
+
+    ``submit(kind, username, fn)`` returns at once; ``fn(progress)`` runs on a
+    worker thread and returns the job's payload, calling ``progress(stage)``
+    as it goes. At most ``max_pending`` jobs may be queued or running;
+    beyond that ``submit`` raises ``QueueFull``. Job ids start with
+    ``id_prefix``.
+    """
+
+    def __init__(self, workers=4, ttl=600, max_pending=100, id_prefix=""):
+        self.id_prefix = id_prefix
+        self.workers = max(1, workers)
+        self.ttl = ttl
+        self.max_pending = max(1, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scrape-job")
+        self._jobs = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.counters = collections.Counter()
+
+    def submit(self, kind, username, fn):
+        job = Job(kind, username, self.id_prefix)
+        with self._lock:
+            self._purge(time.time())
+            pending = sum(1 for other in self._jobs.values() if other.status not in FINISHED)
+            if pending >= self.max_pending:
+                self.counters["rejected"] += 1
+                raise QueueFull("Too many jobs in progress (%d)" % pending)
+            self._jobs[job.id] = job
+            self.counters["submitted"] += 1
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def wait(self, job_id, version=None, timeout=0):
+        """Wait until the job changes past ``version`` or ``timeout`` seconds pass.
+
+        Returns ``(snapshot dict, version)`` taken under the lock, or None if
+        there is no such job (or it expired).
+        """
+        with self._changed:
+            self._purge(time.time())
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            self._changed.wait_for(lambda: job.version != version, timeout)
+            return job.to_dict(), job.version
+
+    def stats(self):
+        with self._lock:
+            statuses = collections.Counter(job.status for job in self._jobs.values())
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "ttl": self.ttl,
+                "jobs": dict(statuses),
+                "submitted": self.counters["submitted"],
+                "rejected": self.counters["rejected"],
+                "failed": self.counters["failed"],
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job, fn):
+        self._update(job, status="running", stage="started", started=time.time())
+        try:
+            result = fn(lambda stage: self._update(job, stage=stage))
+            status = "done"
+        except Exception as e:
+            logger.exception("%s job for user %s failed", job.kind, job.username)
+            result = {"success": False, "message": str(e)}
+            status = "failed"
+        with self._lock:
+            if status == "failed":
+                self.counters["failed"] += 1
+        self._update(job, status=status, stage=status, result=result, finished=time.time())
+
+    def _update(self, job, **changes):
+        with self._changed:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._changed.notify_all()
+
+    def _purge(self, now):
+        # Caller holds self._lock
+        for job_id, job in list(self._jobs.items()):
+            if job.finished is not None and now - job.finished > self.ttl:
+                del self._jobs[job_id]
@@ -0,0 +1,200 @@
+"""In-process metrics, served at ``/metrics`` in the Prometheus text format.
+
+Histograms and counters are updated where the work happens; gauges are read
+from a callback when metrics are collected. ``Registry.snapshot()`` returns
+plain data so the scraper service can collect it from its worker processes
+and ``merge`` the snapshots before ``render``.
+"""
+import bisect
+import contextlib
+import threading
+import time
+
+# Seconds; wide enough for a cold Chrome login
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            series = [[list(labels), list(counts), total, count] for labels, (counts, total, count) in self._series.items()]
+        return {"type": "histogram", "help": self.help, "labelnames": list(self.labelnames),
+                "buckets": list(self.buckets), "series": series}
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            series = [[list(labels), value] for labels, value in self._values.items()]
+        return {"type": "counter", "help": self.help, "labelnames": list(self.labelnames), "series": series}
+
+
+class Gauge:
+    """``read()`` returns a number, or a dict of label value tuples to numbers."""
+
+    def __init__(self, name, help, read, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.read = read
+
+    def snapshot(self):
+        value = self.read()
+        values = value if isinstance(value, dict) else {(): value}
+        series = [[list(labels), number] for labels, number in values.items() if number is not None]
+        return {"type": "gauge", "help": self.help, "labelnames": list(self.labelnames), "series": series}
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, read, labelnames=()):
+        return self._register(Gauge(name, help, read, labelnames))
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def _register(self, metric):
+        with self._lock:
+            # Re-registering a gauge (e.g. a module imported twice) replaces its callback
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not isinstance(metric, Gauge):
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+
+def merge(snapshots):
+    """Add up snapshots from several processes, series by series."""
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.get(name)
+            if target is None:
+                merged[name] = dict(metric, series=[list(s) for s in metric["series"]])
+                continue
+            series = {tuple(s[0]): s for s in target["series"]}
+            for labels, *values in metric["series"]:
+                existing = series.get(tuple(labels))
+                if existing is None:
+                    target["series"].append([labels] + values)
+                elif metric["type"] == "histogram":
+                    existing[1] = [a + b for a, b in zip(existing[1], values[0])]
+                    existing[2] += values[1]
+                    existing[3] += values[2]
+                else:
+                    existing[1] += values[0]
+    return merged
+
+
+def render(snapshot):
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        lines.append("# HELP %s %s" % (name, metric["help"]))
+        lines.append("# TYPE %s %s" % (name, metric["type"]))
+        labelnames = metric["labelnames"]
+        for series in sorted(metric["series"], key=lambda s: [str(v) for v in s[0]]):
+            labels = list(zip(labelnames, series[0]))
+            if metric["type"] != "histogram":
+                lines.append("%s%s %s" % (name, _labels(labels), _number(series[1])))
+                continue
+            counts, total, count = series[1:]
+            cumulative = 0
+            for bound, bucket in zip(metric["buckets"] + ["+Inf"], counts):
+                cumulative += bucket
+                le = bound if bound == "+Inf" else _number(bound)
+                lines.append("%s_bucket%s %d" % (name, _labels(labels + [("le", le)]), cumulative))
+            lines.append("%s_sum%s %s" % (name, _labels(labels), _number(total)))
+            lines.append("%s_count%s %d" % (name, _labels(labels), count))
+    return "\n".join(lines) + "\n"
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (
+        '%s="%s"' % (key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+# Every timed step of a scrape: driver launch/acquire, login, page loads and
+# requests, readiness waits, script extraction and result computation
+STAGE_SECONDS = REGISTRY.histogram(
+    "arms_stage_seconds", "Seconds spent per scrape stage and step", ("stage", "step")
+)
+
+# Whole scrapes as served to the routes and jobs; session is cold, warm,
+# restored, cached or failed
+SCRAPE_SECONDS = REGISTRY.histogram(
+    "arms_scrape_seconds", "Seconds per fetch_payload call", ("kind", "session")
+)
+
+# Roundtrips to chromedriver (WebDriver commands) or ARMS (HTTP requests)
+ROUNDTRIPS = REGISTRY.counter(
+    "arms_roundtrips_total", "WebDriver commands and HTTP requests sent, by engine and command", ("engine", "command")
+)
+
+
+def observe_stage(label, seconds):
+    """Record a ``"stage:step"`` label as used by ``readiness.timed``."""
+    stage, _, step = label.partition(":")
+    STAGE_SECONDS.observe(seconds, stage, step)
+
+
+@contextlib.contextmanager
+def timer(stage, step=""):
+    """Record the duration of the block under ``arms_stage_seconds``."""
+    start = time.time()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.time() - start, stage, step)
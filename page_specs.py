@@ -0,0 +1,231 @@
+"""Declarative descriptions of the ARMS pages the scrapers read.
+
+A ``PageSpec`` names the fields to read by element id and, for pages with a
+results table, the table's columns (by position or by header text) with
+their types. The Selenium engine hands a spec to ``EXTRACT_JS`` so one
+``execute_async_script`` call waits for the page to be ready, extracts
+every field and returns typed JSON; without it every wait poll and DOM read
+is a separate WebDriver roundtrip.
+"""
+
+# Runs in the page: poll until ready (or the login form shows up, or time
+# runs out), then extract. Resolves to {status: "ok" | "expired" | "timeout",
+# data, waited, polls}; a snapshot spec returns the page's html and url
+# instead of data, for arms_parser to read.
+EXTRACT_JS = """
+    var spec = arguments[0];
+    var done = arguments[arguments.length - 1];
+    var started = Date.now(), polls = 0, lastRows = -1, lastResources = -1, stable = 0;
+
+    function byId(id) { return document.getElementById(id); }
+    function busy() {
+        if (document.readyState === 'loading') return true;
+        if (window.jQuery && window.jQuery.active > 0) return true;
+        if (window.Sys && Sys.WebForms && Sys.WebForms.PageRequestManager) {
+            var prm = Sys.WebForms.PageRequestManager.getInstance();
+            if (prm && prm.get_isInAsyncPostBack()) return true;
+        }
+        return false;
+    }
+    function ready() {
+        if (byId('txtusername')) return 'expired';
+        if (spec.ready_text) {
+            var element = byId(spec.ready_text);
+            if (!element || !element.textContent.trim()) return false;
+        }
+        if (!spec.table) return true;
+        var table = byId(spec.table.id);
+        if (!table || busy()) { stable = 0; return false; }
+        // Rows (and requests made by the page) must stop changing between two polls
+        var rows = table.rows.length;
+        var resources = performance.getEntriesByType('resource').length;
+        var settled = rows >= spec.table.min_rows && rows === lastRows && resources === lastResources;
+        lastRows = rows;
+        lastResources = resources;
+        stable = settled ? stable + 1 : 0;
+        return stable >= spec.table.stable_polls;
+    }
+    function convert(text, column) {
+        if (column.strip) text = text.split(column.strip).join('');
+        text = text.trim();
+        if (column.type === 'text') return text;
+        var value = column.type === 'int' ? parseInt(text, 10) : parseFloat(text);
+        return isNaN(value) ? null : value;
+    }
+    // Only the table's own rows and cells: a table nested in a cell adds none (as arms_parser)
+    function cellsOf(row, tag) {
+        return Array.prototype.filter.call(row.cells, function(cell) { return cell.tagName === tag; });
+    }
+    function ownSpan(cell, table) {
+        var spans = cell.getElementsByTagName('span');
+        for (var s = 0; s < spans.length; s++) {
+            if (spans[s].closest('table') === table) return spans[s];
+        }
+        return null;
+    }
+    function extractTable(table) {
+        var rows = table.rows;
+        var names = Object.keys(spec.table.columns);
+        var indexes = {};
+        // GridView headers are <th>; fall back to a first row of <td> headers
+        var header = [];
+        for (var r = 0; r < rows.length && !header.length; r++) header = cellsOf(rows[r], 'TH');
+        if (!header.length && rows.length) header = cellsOf(rows[0], 'TD');
+        names.forEach(function(name) {
+            var column = spec.table.columns[name];
+            indexes[name] = column.index;
+            if (column.header) {
+                indexes[name] = -1;
+                for (var h = 0; h < header.length; h++) {
+                    if (header[h].textContent.toLowerCase().indexOf(column.header) !== -1) { indexes[name] = h; break; }
+                }
+            }
+        });
+        var records = [];
+        for (var i = spec.table.skip_rows; i < rows.length; i++) {
+            var cells = cellsOf(rows[i], 'TD');
+            if (cells.length < spec.table.min_cells) continue;
+            var record = {}, complete = true;
+            names.forEach(function(name) {
+                var column = spec.table.columns[name], index = indexes[name], value = null;
+                if (index >= 0 && index < cells.length) {
+                    var cell = cells[index];
+                    if (column.span) {
+                        var span = ownSpan(cell, table);
+                        value = convert(span ? span.textContent : '', column);
+                    } else {
+                        value = convert(cell.textContent, column);
+                    }
+                }
+                if (value === null && column.required) complete = false;
+                record[name] = value;
+            });
+            if (complete) records.push(record);
+        }
+        return records;
+    }
+    function extract() {
+        var data = {};
+        Object.keys(spec.fields).forEach(function(name) {
+            var field = spec.fields[name], element = byId(field.id);
+            var value = element ? element[field.property] : '';
+            data[name] = typeof value === 'string' ? value.trim() : value;
+        });
+        if (spec.table) data[spec.table.key] = extractTable(byId(spec.table.id));
+        return data;
+    }
+    function poll() {
+        polls++;
+        var state = ready();
+        if (state === 'expired') return done({status: 'expired', waited: Date.now() - started, polls: polls});
+        if (state && spec.snapshot) {
+            return done({status: 'ok', html: document.documentElement.outerHTML, url: location.href,
+                         waited: Date.now() - started, polls: polls});
+        }
+        if (state) return done({status: 'ok', data: extract(), waited: Date.now() - started, polls: polls});
+        if (Date.now() - started > spec.timeout_ms) {
+            return done({status: 'timeout', waited: Date.now() - started, polls: polls});
+        }
+        setTimeout(poll, spec.poll_ms);
+    }
+    poll();
+"""
+
+
+def field(element_id, property="textContent"):
+    """Read ``property`` (``textContent``, ``src``, ...) of the element with ``element_id``."""
+    return {"id": element_id, "property": property}
+
+
+def column(index=None, header=None, type="text", span=False, strip=None, required=False):
+    """A table column at ``index``, or the first whose header text contains ``header``.
+
+    ``type`` is ``text``, ``int`` or ``float`` (the cell's leading number, as
+    parseInt/parseFloat read it, or None without one); ``span`` reads the cell's first ``<span>``; ``strip`` is removed
+    from the text first; rows where a ``required`` column is None are skipped.
+    """
+    if (index is None) == (header is None):
+        raise ValueError("A column needs exactly one of index or header")
+    if type not in ("text", "int", "float"):
+        raise ValueError("Unknown column type %r" % type)
+    return {
+        "index": index, "header": header.lower() if header else None, "type": type,
+        "span": span, "strip": strip, "required": required,
+    }
+
+
+def table(element_id, key, columns, skip_rows=1, min_cells=1, min_rows=1, stable_polls=1):
+    """A results table; its records are returned under ``key``. The first
+    ``skip_rows`` rows are headers and rows with fewer than ``min_cells``
+    cells are skipped."""
+    return {
+        "id": element_id, "key": key, "columns": dict(columns), "skip_rows": skip_rows,
+        "min_cells": min_cells, "min_rows": min_rows, "stable_polls": stable_polls,
+    }
+
+
+class PageSpec:
+    """Fields and an optional table to read from one ARMS page.
+
+    The page is ready once ``ready_text`` (an element id) has text and the
+    table exists and its row count settled. ``expire_on_timeout`` treats a
+    page that never gets ready as a lost session.
+    """
+
+    def __init__(self, name, path, fields=None, table=None, ready_text=None, timeout=15, expire_on_timeout=False,
+                 poll_ms=50):
+        self.name = name
+        self.path = path
+        self.fields = dict(fields or {})
+        self.table = table
+        self.ready_text = ready_text
+        self.timeout = timeout
+        self.expire_on_timeout = expire_on_timeout
+        # Compiled once: the JSON argument EXTRACT_JS receives
+        self.compiled = {
+            "fields": self.fields,
+            "table": table,
+            "ready_text": ready_text,
+            "timeout_ms": int(timeout * 1000),
+            "poll_ms": poll_ms,
+            "snapshot": False,
+        }
+        # Same wait, but return the page's html for arms_parser.parse_spec
+        self.snapshot = dict(self.compiled, snapshot=True)
+
+
+PROFILE = PageSpec(
+    "profile", "/StudentPortal/DataProfile.aspx",
+    fields={
+        "name": field("dvname"),
+        "regno": field("dvregno"),
+        "program": field("dvprogram"),
+        "imgUrl": field("imgprofile", "src"),
+    },
+    # 'dvname' is filled in client-side
+    ready_text="dvname",
+    timeout=30,
+    expire_on_timeout=True,
+)
+
+GRADES = PageSpec(
+    "grades", "/StudentPortal/MyCourse.aspx",
+    table=table("tblGridViewComplete", "rows", {
+        "code": column(1),
+        "name": column(2),
+        "grade": column(3),
+        "status": column(4, span=True),
+        "completed": column(5),
+        "credits": column(header="credit", type="float"),
+    }, min_cells=6),
+)
+
+ATTENDANCE = PageSpec(
+    "attendance", "/StudentPortal/AttendanceReport.aspx",
+    table=table("tblStudent", "rows", {
+        "course": column(2),
+        "attended": column(3, type="int", required=True),
+        "total": column(5, type="int", required=True),
+        "current_percentage": column(7, type="float", strip="%", required=True),
+    }, min_cells=8),
+)
@@ -0,0 +1,61 @@
+"""Reusable page-readiness conditions for the Selenium engine.
+
+Each condition is a callable taking the driver, usable with ``wait_for`` (or
+a plain ``WebDriverWait``). They replace fixed ``time.sleep`` pauses: a wait
+returns as soon as the page is actually ready, and ``wait_for`` records how
+long every wait took so slow pages show up in the response timings.
+
+Waits on the scraped pages themselves run inside the page instead (see
+``page_specs.EXTRACT_JS``), so they cost no WebDriver roundtrip per poll;
+these conditions cover the login flow.
+"""
+import contextlib
+import logging
+import time
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+POLL_FREQUENCY = 0.1
+
+def element_present(element_id):
+    """The element exists in the DOM."""
+    def condition(driver):
+        return driver.execute_script("return !!document.getElementById(arguments[0]);", element_id)
+    condition.label = "%s present" % element_id
+    return condition
+
+
+def url_contains(fragment):
+    def condition(driver):
+        return fragment in driver.current_url
+    condition.label = "url contains %s" % fragment
+    return condition
+
+
+def wait_for(driver, condition, timeout, timings=None):
+    """Wait until ``condition(driver)`` is truthy and record the wait duration.
+
+    Raises selenium's ``TimeoutException`` like ``WebDriverWait.until``.
+    """
+    label = getattr(condition, "label", getattr(condition, "__name__", "condition"))
+    with timed(timings, "wait:" + label):
+        return WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(condition)
+
+
+@contextlib.contextmanager
+def timed(timings, label):
+    """Record the duration of the block in ``timings[label]`` (seconds) and
+    in the ``arms_stage_seconds`` histogram (``label`` is ``"stage:step"``)."""
+    start = time.time()
+    try:
+        yield
+    finally:
+        elapsed = time.time() - start
+        logger.info("%s took %.3fs", label, elapsed)
+        metrics.observe_stage(label, elapsed)
+        if timings is not None:
+            timings[label] = round(timings.get(label, 0) + elapsed, 3)
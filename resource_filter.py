@@ -0,0 +1,97 @@
+"""Blocks requests ARMS pages make but the scrapers never use.
+
+Block lists are applied per tab with the DevTools ``Network.setBlockedURLs``
+command, so blocked requests fail inside Chrome before they hit the network.
+Requests blocked and bytes actually downloaded are read back from the
+driver's performance log. Blocked requests never get a response, so the
+bytes they would have cost are unknown: ``bytes_received`` is what the
+pages still downloaded, not what blocking saved.
+"""
+import collections
+import fnmatch
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# DevTools patterns: '*' matches any run of characters, including none
+DEFAULT_BLOCK_PATTERNS = (
+    "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+    "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.svg*", "*.ico*", "*.webp*", "*.bmp*",
+    "*.css*",
+    "*.mp4*", "*.webm*", "*.mp3*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+)
+
+# Chrome reports requests blocked through setBlockedURLs with this reason
+_BLOCKED_REASON = "inspector"
+
+
+class ResourceFilter:
+    """Per-page URL block lists for Chrome.
+
+    ``block`` patterns apply to every page (the defaults when None).
+    ``pages`` maps a page name such as ``"MyCourse.aspx"`` to a dict with
+    extra ``block`` patterns and ``allow`` patterns; an allow pattern lifts
+    every block pattern it matches (fnmatch) on that page, e.g. ``"*.jpg*"``
+    or ``"*"``.
+    """
+
+    def __init__(self, block=None, pages=None):
+        self.block = tuple(DEFAULT_BLOCK_PATTERNS if block is None else block)
+        self.pages = dict(pages or {})
+        self._lock = threading.Lock()
+        self.counters = collections.Counter()
+
+    def patterns_for(self, path):
+        rules = self.pages.get(path.rsplit("/", 1)[-1], {})
+        allow = rules.get("allow", ())
+        patterns = self.block + tuple(rules.get("block", ()))
+        return tuple(
+            pattern for pattern in dict.fromkeys(patterns)
+            if not any(fnmatch.fnmatchcase(pattern, lifted) for lifted in allow)
+        )
+
+    def apply(self, driver, patterns):
+        """Block ``patterns`` in the driver's current tab."""
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+
+    def record(self, driver):
+        """Drain the driver's performance log into the counters."""
+        try:
+            entries = driver.get_log("performance")
+        except Exception as e:
+            logger.debug("Performance log unavailable: %s", e)
+            return
+        counts = collections.Counter()
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method, params = message.get("method"), message.get("params", {})
+            if method == "Network.loadingFinished":
+                counts["requests_loaded"] += 1
+                counts["bytes_received"] += int(params.get("encodedDataLength") or 0)
+            elif method == "Network.loadingFailed":
+                if params.get("blockedReason") == _BLOCKED_REASON:
+                    counts["requests_blocked"] += 1
+                else:
+                    counts["requests_failed"] += 1
+        with self._lock:
+            self.counters.update(counts)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "patterns": len(self.block),
+            "page_rules": sorted(self.pages),
+            "requests_blocked": counters.get("requests_blocked", 0),
+            "requests_loaded": counters.get("requests_loaded", 0),
+            "requests_failed": counters.get("requests_failed", 0),
+            "bytes_received": counters.get("bytes_received", 0),
+        }
@@ -0,0 +1,72 @@
+import collections
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+
+class ResultCache:
+    """Per-user TTL cache of scrape payloads.
+
+    Entries are keyed by kind ("grades", "attendance", ...), username and a
+    keyed hash of the password, so a cached result is only served to a
+    request carrying the same credentials that produced it. ``ttls`` maps
+    each kind to its lifetime in seconds; a kind with TTL 0 is never cached.
+    """
+
+    def __init__(self, ttls, max_entries=1000):
+        self.ttls = dict(ttls)
+        self.max_entries = max(1, max_entries)
+        # Hashes never leave the process, so a per-process key is enough
+        self._secret = os.urandom(32)
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = collections.Counter()
+        self.misses = collections.Counter()
+
+    def get(self, kind, username, password):
+        """Return ``(payload, age in seconds)`` or None on a miss."""
+        key = self.key(kind, username, password)
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is None or now - entry[0] > self.ttls.get(kind, 0):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses[kind] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits[kind] += 1
+            return entry[1], now - entry[0]
+
+    def put(self, kind, username, password, payload):
+        if self.ttls.get(kind, 0) <= 0:
+            return
+        key = self.key(kind, username, password)
+        with self._lock:
+            self._entries[key] = (time.time(), payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username):
+        """Drop every cached payload of ``username``."""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == username]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttls": dict(self.ttls),
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+            }
+
+    def key(self, kind, username, password):
+        """Cache key for a payload; also identifies identical requests."""
+        digest = hmac.new(self._secret, (password or "").encode("utf-8"), hashlib.sha256).hexdigest()
+        return (kind, username, digest)
@@ -0,0 +1,373 @@
+"""Scrape orchestration: engines, logged-in sessions, caching and retries.
+
+Runs inside the Flask process, or inside each worker of ``scraper_service``
+when the app is configured to use one.
+"""
+import atexit
+import logging
+import time
+
+import attendance_math
+import chromedriver
+import config
+import gpa
+import grading
+import metrics
+from coalesce import RequestCoalescer
+from cookie_store import CookieStore
+from driver_pool import DriverPool, PoolExhausted
+from errors import LoginFailed, ScrapeError, SessionExpired
+from http_engine import HttpSession
+from result_cache import ResultCache
+from selenium_engine import SeleniumSession, browser_lost, launch_driver, resource_filter
+from session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+# Pre-launched drivers so a cold login only pays for the ARMS round trips
+driver_pool = DriverPool(
+    launch_driver,
+    size=config.DRIVER_POOL_SIZE,
+    min_idle=config.DRIVER_POOL_MIN_IDLE,
+    max_total=config.DRIVER_POOL_MAX_TOTAL,
+    acquire_timeout=config.DRIVER_POOL_ACQUIRE_TIMEOUT,
+)
+
+# Persistent logged-in engine sessions keyed by username, bounded by LRU + idle TTL
+logged_in_sessions = SessionStore(
+    lambda session: session.quit(),
+    max_sessions=config.SESSION_MAX_LIVE,
+    idle_ttl=config.SESSION_IDLE_TTL,
+    reap_interval=config.SESSION_REAP_INTERVAL,
+)
+
+# Recent successful payloads so repeat clicks don't touch the portal
+result_cache = ResultCache(
+    {
+        "grades": config.RESULT_CACHE_GRADES_TTL,
+        "attendance": config.RESULT_CACHE_ATTENDANCE_TTL,
+        "dashboard": config.RESULT_CACHE_DASHBOARD_TTL,
+    },
+    max_entries=config.RESULT_CACHE_MAX_ENTRIES,
+)
+
+# ARMS cookies saved on disk so sessions survive restarts and deploys
+cookie_store = CookieStore(config.COOKIE_STORE_DIR, ttl=config.COOKIE_STORE_TTL) if config.COOKIE_STORE_DIR else None
+
+# Identical concurrent requests share one scrape
+in_flight = RequestCoalescer()
+
+# Loaded and validated once; a bad scheme stops startup instead of failing requests
+grading_scheme = grading.load(config.GRADING_SCHEME, config.GRADING_SCHEMES_FILE or None)
+
+def _pool_drivers():
+    pool = driver_pool.stats()
+    return {("idle",): pool["idle"], ("in_use",): pool["in_use"]}
+
+metrics.REGISTRY.gauge("arms_driver_pool_drivers", "Chrome drivers held by the pool, by state", _pool_drivers, ("state",))
+metrics.REGISTRY.gauge("arms_driver_pool_max_drivers", "Cap on Chrome drivers (DRIVER_POOL_MAX_TOTAL)", lambda: driver_pool.max_total)
+metrics.REGISTRY.gauge("arms_chromedriver_up", "1 while the shared chromedriver is running", lambda: int(chromedriver.shared_service.stats()["running"]))
+metrics.REGISTRY.gauge("arms_sessions_live", "Logged-in ARMS sessions held", lambda: len(logged_in_sessions))
+metrics.REGISTRY.gauge("arms_scrapes_in_flight", "Scrapes currently running", in_flight.in_flight)
+
+ENGINES = {
+    "selenium": lambda: SeleniumSession(driver_pool),
+    "http": HttpSession,
+}
+
+def drop_selenium_sessions():
+    """Forget every Selenium session; their browsers died with the shared chromedriver."""
+    dropped = logged_in_sessions.remove_where(lambda session: session.engine == "selenium", "chromedriver")
+    if dropped:
+        logger.warning("Dropped %d Selenium sessions after a chromedriver restart", dropped)
+
+def engine_order():
+    engines = [config.SCRAPER_ENGINE]
+    if config.SCRAPER_FALLBACK and config.SCRAPER_ENGINE != "selenium":
+        engines.append("selenium")
+    return engines
+
+_started = False
+
+def start():
+    """Start the background threads of the pool and session store (once per process)."""
+    global _started
+    if _started:
+        return
+    _started = True
+    if "selenium" in engine_order():
+        # Fails startup when there is no chromedriver, rather than every login
+        chromedriver.resolve()
+        if config.CHROMEDRIVER_SHARED:
+            chromedriver.shared_service.on_restart(drop_selenium_sessions)
+            chromedriver.shared_service.url()
+            chromedriver.shared_service.start_monitor(config.CHROMEDRIVER_HEALTH_INTERVAL)
+        driver_pool.start()
+    logged_in_sessions.start()
+    logged_in_sessions.start_keepalive(
+        lambda session: session.is_alive(),
+        interval=config.SESSION_KEEPALIVE_INTERVAL,
+        hot_window=config.SESSION_HOT_WINDOW,
+    )
+    atexit.register(stop)
+
+def stop():
+    """Quit every logged-in session and pooled driver."""
+    logged_in_sessions.close()
+    driver_pool.shutdown()
+    chromedriver.shared_service.stop()
+
+def stats():
+    return {
+        "result_cache": result_cache.stats(),
+        "in_flight": {"running": in_flight.in_flight(), "coalesced": in_flight.coalesced},
+        "sessions": logged_in_sessions.stats(),
+        "driver_pool": driver_pool.stats(),
+        "chromedriver": chromedriver.shared_service.stats(),
+        "resource_filter": resource_filter.stats() if resource_filter else None
+    }
+
+def metrics_snapshot():
+    return metrics.REGISTRY.snapshot()
+
+def ignore_progress(stage):
+    pass
+
+def login_and_store_session(username, password, engines=None):
+    """Log in with the first engine that works and store the session."""
+    for name in engines or engine_order():
+        session = ENGINES[name]()
+        try:
+            with metrics.timer("login", name):
+                session.login(username, password)
+        except LoginFailed as e:
+            logger.error("Login exception (%s engine): %s", name, e)
+            return None
+        except ScrapeError as e:
+            logger.warning("%s engine could not log in user %s: %s", name, username, e)
+            session.quit()
+            continue
+        logged_in_sessions.put(username, session, password)
+        logger.info("%s session stored for user: %s", name, username)
+        save_cookies(username, password, session)
+        return session
+    return None
+
+def restore_session(username, password, engines=None):
+    """Resume the user's session from cookies saved under the same password and
+    store it, skipping the login."""
+    cookies = cookie_store.load(username, password) if cookie_store else None
+    if not cookies:
+        return None
+    name = (engines or engine_order())[0]
+    session = ENGINES[name]()
+    with metrics.timer("restore", name):
+        restored = session.restore(cookies)
+    if not restored:
+        logger.info("Saved cookies of user %s are no longer valid", username)
+        session.quit()
+        cookie_store.delete(username)
+        return None
+    logged_in_sessions.put(username, session, password)
+    logger.info("%s session restored from saved cookies for user: %s", name, username)
+    return session
+
+def save_cookies(username, password, session):
+    if cookie_store is None:
+        return
+    try:
+        cookie_store.save(username, password, session.export_cookies())
+    except Exception as e:
+        logger.warning("Could not save cookies of user %s: %s", username, e)
+
+def with_session(username, password, scrape, progress=ignore_progress):
+    """Run ``scrape(session)`` on the user's ARMS session and return its payload.
+
+    Requests for the same user are serialised on a lease of their session;
+    the time spent waiting for it is reported as ``queue_wait``. A password
+    other than the one the session logged in with gets a new login instead.
+    """
+    progress("waiting for session")
+    with logged_in_sessions.lease(username, password) as (session, waited):
+        metrics.STAGE_SECONDS.observe(waited, "queue", "session")
+        payload = run_scrape(session, username, password, scrape, progress)
+    return dict(payload, queue_wait=round(waited, 3))
+
+def run_scrape(session, username, password, scrape, progress=ignore_progress):
+    """Scrape on ``session`` (resuming from saved cookies or logging in if it is None),
+    retrying once on a new login.
+
+    An expired session, or a Selenium session whose browser is gone, is
+    logged in again with the supplied password, and a page the HTTP engine
+    cannot read is retried through Selenium. The payload's
+    ``session`` says whether the scrape ran on a live session ("warm"), one
+    resumed from cookies ("restored") or a new login ("cold").
+    """
+    engines = None
+    origin = "warm"
+    for attempt in range(2):
+        if session is None:
+            progress("logging in")
+            try:
+                session = restore_session(username, password, engines)
+                origin = "restored"
+                if session is None:
+                    if not password:
+                        return {"success": False, "message": "Missing credentials for login."}
+                    logger.info("No persistent session found. Logging in user: %s", username)
+                    session = login_and_store_session(username, password, engines)
+                    origin = "cold"
+            except PoolExhausted as e:
+                logger.error("No driver available for user %s: %s", username, e)
+                return {"success": False, "message": "Server busy, please try again shortly"}
+            if session is None:
+                return {"success": False, "message": "Login failed, please check credentials"}
+
+        progress("scraping")
+        try:
+            return dict(scrape(session), session=origin)
+        except SessionExpired as e:
+            logged_in_sessions.remove(username)
+            if cookie_store:
+                cookie_store.delete(username)
+            if not password or attempt == 1:
+                return {"success": False, "message": str(e)}
+            logger.info("Session of user %s expired, logging in again: %s", username, e)
+            engines = [session.engine]
+        except ScrapeError as e:
+            if session.engine == "selenium" or not config.SCRAPER_FALLBACK or not password or attempt == 1:
+                raise
+            logger.warning("HTTP engine failed for user %s, falling back to Selenium: %s", username, e)
+            engines = ["selenium"]
+        except Exception as e:
+            if session.engine != "selenium" or not browser_lost(e):
+                raise
+            # Stored sessions are refreshed on every get(), so the idle TTL would never drop this one
+            logged_in_sessions.remove(username)
+            if not password or attempt == 1:
+                logger.error("Browser of user %s is gone: %s", username, e)
+                return {"success": False, "message": "Browser session lost, please try again"}
+            logger.warning("Browser of user %s is gone, logging in again: %s", username, e)
+            engines = [session.engine]
+        session = None
+
+def cached_scrape(kind, username, password, scrape, force_refresh=False, progress=ignore_progress):
+    """Serve ``kind`` from the result cache, scraping via ``with_session`` on a miss.
+
+    A request identical to one already being scraped waits for it and
+    shares its payload instead of scraping again.
+    """
+    if not force_refresh:
+        cached = result_cache.get(kind, username, password)
+        if cached is not None:
+            payload, age = cached
+            logger.info("Serving cached %s for user: %s (%.0fs old)", kind, username, age)
+            return dict(payload, cached=True, cache_age=round(age, 2))
+
+    start = time.time()
+    payload, shared = in_flight.run(
+        result_cache.key(kind, username, password),
+        lambda: with_session(username, password, scrape, progress)
+    )
+    if shared:
+        logger.info("Shared in-flight %s scrape for user: %s", kind, username)
+        return dict(payload, cached=False, coalesced=True, queue_wait=round(time.time() - start, 3))
+    if payload.get("success"):
+        result_cache.put(kind, username, password, payload)
+    return dict(payload, cached=False)
+
+@metrics.timer("compute", "cgpa")
+def compute_grades(rows):
+    """``courses`` (passed, with points), ``arrears``, ``cgpa``, ``total_credits``,
+    per-term ``semesters`` and ``uncredited`` payload fields from raw MyCourse rows."""
+    courses, arrears = grading_scheme.apply(rows)
+    return dict(gpa.summarize(courses), courses=courses, arrears=arrears)
+
+@metrics.timer("compute", "attendance")
+def compute_attendance(attendance_data):
+    return attendance_math.annotate(attendance_data, config.ATTENDANCE_THRESHOLDS)
+
+def scrape_grades(session):
+    session.timings.clear()
+    session.roundtrips.clear()
+    start_time = time.time()
+    student_data, rows = session.fetch_profile_and_grades()
+
+    elapsed = time.time() - start_time
+    logger.info("Total execution time: %.2fs", elapsed)
+
+    return {
+        "success": True,
+        "student_data": student_data,
+        **compute_grades(rows),
+        "execution_time": elapsed,
+        "wait_times": dict(session.timings),
+        "roundtrips": dict(session.roundtrips),
+        "engine": session.engine
+    }
+
+def scrape_attendance(session):
+    session.timings.clear()
+    session.roundtrips.clear()
+    start_time = time.time()
+    attendance_data = session.fetch_attendance()
+
+    return {
+        "success": True,
+        "attendance": compute_attendance(attendance_data),
+        "execution_time": time.time() - start_time,
+        "wait_times": dict(session.timings),
+        "roundtrips": dict(session.roundtrips),
+        "engine": session.engine
+    }
+
+def scrape_dashboard(session):
+    session.timings.clear()
+    session.roundtrips.clear()
+    start_time = time.time()
+    student_data, rows, attendance_data = session.fetch_dashboard()
+
+    elapsed = time.time() - start_time
+    logger.info("Total dashboard execution time: %.2fs", elapsed)
+
+    return {
+        "success": True,
+        "student_data": student_data,
+        **compute_grades(rows),
+        "attendance": compute_attendance(attendance_data),
+        "execution_time": elapsed,
+        "wait_times": dict(session.timings),
+        "roundtrips": dict(session.roundtrips),
+        "engine": session.engine
+    }
+
+SCRAPES = {
+    "grades": scrape_grades,
+    "attendance": scrape_attendance,
+    "dashboard": scrape_dashboard,
+}
+
+# Kinds whose payload includes grades: only served to the password the session logged in with
+GRADE_KINDS = ("grades", "dashboard")
+
+def fetch_payload(kind, username, password, force_refresh=False, progress=ignore_progress):
+    """Cached scrape of ``kind`` ("grades", "attendance" or "dashboard"), as served by the routes and jobs."""
+    if kind in GRADE_KINDS and not password:
+        # Grades are never served from a session on the username alone
+        return {"success": False, "message": "Missing credentials"}
+    start = time.time()
+    outcome = "failed"
+    try:
+        payload = cached_scrape(kind, username, password, SCRAPES[kind], force_refresh, progress)
+        if payload["success"]:
+            outcome = "cached" if payload["cached"] else payload.get("session", "warm")
+    finally:
+        metrics.SCRAPE_SECONDS.observe(time.time() - start, kind, outcome)
+    if kind == "dashboard" and payload["success"] and not payload["cached"]:
+        # One dashboard scrape also answers the single-page endpoints
+        common = ("success", "execution_time", "wait_times", "engine")
+        grades = {key: payload[key] for key in common + ("student_data", "courses", "arrears", "cgpa", "total_credits", "semesters", "uncredited")}
+        attendance = {key: payload[key] for key in common + ("attendance",)}
+        result_cache.put("grades", username, password, grades)
+        result_cache.put("attendance", username, password, attendance)
+    return payload
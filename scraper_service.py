@@ -0,0 +1,389 @@
+"""Scraper service: worker processes that own every browser and ARMS session.
+
+Run it beside the web app with the same ``SCRAPER_SERVICE_ADDRESS``::
+
+    SCRAPER_SERVICE_ADDRESS=/tmp/arms-scraper.sock python scraper_service.py
+
+Web workers then forward scrapes to it through ``ScraperClient`` instead of
+running Chrome themselves, so web concurrency and browser concurrency are
+sized independently. Each username is always routed to the same worker
+process, which holds that user's session, cached results and in-flight
+scrapes, so any web worker reuses the same logged-in session. A worker that
+dies is restarted; its users log in again (or resume from saved cookies).
+"""
+import itertools
+import logging
+import os
+import queue
+import signal
+import sys
+import threading
+import zlib
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client, Listener
+
+import config
+import metrics
+from errors import ServiceError, ServiceUnavailable
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(processName)s %(name)s: %(message)s"
+
+
+def worker_for(username, workers):
+    """Index of the worker process that owns ``username``'s session."""
+    return zlib.crc32(username.encode("utf-8")) % workers
+
+
+def _worker_main(conn, threads):
+    """Entry point of a worker process: serve requests from the dispatcher on ``conn``."""
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    # Ctrl-C reaches the whole process group; workers exit once the dispatcher closes the pipe
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import scraper
+    scraper.start()
+
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def handle(request_id, method, args):
+        try:
+            if method == "fetch_payload":
+                result = scraper.fetch_payload(*args, progress=lambda stage: send(("progress", request_id, stage)))
+            elif method == "stats":
+                result = scraper.stats()
+            elif method == "metrics":
+                result = scraper.metrics_snapshot()
+            else:
+                raise ValueError("Unknown method %r" % method)
+            send(("result", request_id, result))
+        except Exception as e:
+            logger.exception("%s failed", method)
+            send(("error", request_id, str(e)))
+
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="scrape")
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break  # dispatcher went away
+            if message is None:
+                break  # orderly shutdown
+            executor.submit(handle, *message)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        # atexit handlers don't run in multiprocessing children
+        scraper.stop()
+
+
+class _Worker:
+    def __init__(self, index, process, conn):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.send_lock = threading.Lock()
+        self.pending = {}  # request id -> reply queue
+        self.restarts = 0
+
+
+class ScraperService:
+    """Accepts ``ScraperClient`` connections on a Unix socket and dispatches
+    each request to the worker process owning its username."""
+
+    def __init__(self, address, authkey=None, workers=2, threads=8):
+        self.address = address
+        self.authkey = authkey
+        self.threads = max(1, threads)
+        self._workers = [None] * max(1, workers)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._context = multiprocessing.get_context("spawn")
+        self._closing = False
+        self.requests = 0
+
+    def serve_forever(self):
+        for index in range(len(self._workers)):
+            self._workers[index] = self._start_worker(index)
+
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # stale socket from a previous run
+        listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        os.chmod(self.address, 0o600)
+        logger.info("Scraper service listening on %s with %d workers", self.address, len(self._workers))
+        accepting = threading.Thread(target=self._accept_loop, args=(listener,), name="accept", daemon=True)
+        accepting.start()
+        try:
+            # Join in short slices so signal handlers get to run in the main thread
+            while accepting.is_alive():
+                accepting.join(1)
+        finally:
+            logger.info("Stopping scraper service")
+            self._closing = True
+            listener.close()
+            for worker in self._workers:
+                try:
+                    with worker.send_lock:
+                        worker.conn.send(None)
+                except OSError:
+                    pass
+            for worker in self._workers:
+                worker.process.join(30)
+
+    def _accept_loop(self, listener):
+        while not self._closing:
+            try:
+                conn = listener.accept()
+            except multiprocessing.AuthenticationError as e:
+                logger.warning("Rejected client: %s", e)
+                continue
+            except OSError:
+                break  # listener closed
+            threading.Thread(target=self._serve_client, args=(conn,), name="client", daemon=True).start()
+
+    def _start_worker(self, index):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main, args=(child_conn, self.threads), name="scraper-worker-%d" % index, daemon=True
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(index, process, parent_conn)
+        threading.Thread(target=self._read_worker, args=(worker,), name="worker-%d-reader" % index, daemon=True).start()
+        logger.info("Started scraper worker %d (pid %d)", index, process.pid)
+        return worker
+
+    def _read_worker(self, worker):
+        while True:
+            try:
+                kind, request_id, value = worker.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                replies = worker.pending.get(request_id) if kind == "progress" else worker.pending.pop(request_id, None)
+            if replies is not None:
+                replies.put((kind, value))
+
+        worker.process.join(5)
+        with self._lock:
+            pending, worker.pending = worker.pending, {}
+        for replies in pending.values():
+            replies.put(("error", "Scraper worker exited during the request"))
+        if self._closing:
+            return
+        logger.error("Scraper worker %d exited with code %s, restarting", worker.index, worker.process.exitcode)
+        replacement = self._start_worker(worker.index)
+        replacement.restarts = worker.restarts + 1
+        self._workers[worker.index] = replacement
+
+    def _call(self, worker, method, args):
+        """Send a request to ``worker``; returns the queue its replies arrive on."""
+        request_id = next(self._ids)
+        replies = queue.Queue()
+        with self._lock:
+            worker.pending[request_id] = replies
+            self.requests += 1
+        try:
+            with worker.send_lock:
+                worker.conn.send((request_id, method, args))
+        except (OSError, ValueError) as e:
+            with self._lock:
+                worker.pending.pop(request_id, None)
+            replies.put(("error", "Scraper worker unavailable: %s" % e))
+        return replies
+
+    def _serve_client(self, conn):
+        with conn:
+            while True:
+                try:
+                    method, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if method == "stats":
+                        conn.send(("result", self._stats()))
+                        continue
+                    if method == "metrics":
+                        conn.send(("result", self._metrics()))
+                        continue
+                    worker = self._workers[worker_for(args[1], len(self._workers))]
+                    replies = self._call(worker, method, args)
+                    while True:
+                        kind, value = replies.get()
+                        conn.send((kind, value))
+                        if kind != "progress":
+                            break
+                except (EOFError, OSError):
+                    return
+
+    def _stats(self):
+        workers = []
+        for worker in list(self._workers):
+            kind, value = self._call(worker, "stats", ()).get()
+            workers.append({
+                "index": worker.index,
+                "pid": worker.process.pid,
+                "restarts": worker.restarts,
+                "pending": len(worker.pending),
+                "stats": value if kind == "result" else {"error": value},
+            })
+        return {"service": {"address": self.address, "requests": self.requests}, "workers": workers}
+
+    def _metrics(self):
+        snapshots = []
+        for worker in list(self._workers):
+            kind, value = self._call(worker, "metrics", ()).get()
+            if kind == "result":
+                snapshots.append(value)
+        return metrics.merge(snapshots)
+
+
+class LocalServer:
+    """Answers ``ScraperClient`` requests in this process on a thread per connection.
+
+    ``handlers`` maps method names to callables, each called with the
+    request's arguments plus a ``progress`` keyword. Lets another web worker
+    hand a scrape to the worker that already holds the user's session (see
+    session_registry.py).
+    """
+
+    def __init__(self, address, handlers, authkey=None):
+        self.address = address
+        self.handlers = dict(handlers)
+        self.authkey = authkey
+        self._listener = None
+
+    def start(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        self._listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        os.chmod(self.address, 0o600)
+        threading.Thread(target=self._accept_loop, name="peer-accept", daemon=True).start()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _accept_loop(self):
+        listener = self._listener
+        while True:
+            try:
+                conn = listener.accept()
+            except multiprocessing.AuthenticationError as e:
+                logger.warning("Rejected peer: %s", e)
+                continue
+            except OSError:
+                return  # listener closed
+            threading.Thread(target=self._serve_client, args=(conn,), name="peer", daemon=True).start()
+
+    def _serve_client(self, conn):
+        def progress(stage):
+            try:
+                conn.send(("progress", stage))
+            except OSError:
+                pass  # caller went away; finish the scrape anyway
+
+        with conn:
+            while True:
+                try:
+                    method, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if method in self.handlers:
+                        reply = ("result", self.handlers[method](*args, progress=progress))
+                    else:
+                        reply = ("error", "Unknown method %r" % method)
+                except Exception as e:
+                    logger.exception("%s failed", method)
+                    reply = ("error", str(e))
+                try:
+                    conn.send(reply)
+                except OSError:
+                    return
+
+
+class ScraperClient:
+    """Forwards scrapes to a ``ScraperService``; a drop-in for the ``scraper`` module.
+
+    Each thread keeps its own connection and reconnects once if the service
+    restarted since its last call.
+    """
+
+    def __init__(self, address, authkey=None):
+        self.address = address
+        self.authkey = authkey
+        self._local = threading.local()
+
+    def start(self):
+        pass  # The service owns the pools and sessions
+
+    def fetch_payload(self, kind, username, password, force_refresh=False, progress=None):
+        return self.call("fetch_payload", (kind, username, password, force_refresh), progress)
+
+    def stats(self):
+        return self.call("stats", ())
+
+    def metrics_snapshot(self):
+        """This process's metrics plus those of every service worker."""
+        return metrics.merge([metrics.REGISTRY.snapshot(), self.call("metrics", ())])
+
+    def call(self, method, args, progress=None):
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.send((method, args))
+                while True:
+                    kind, value = conn.recv()
+                    if kind == "progress":
+                        if progress is not None:
+                            progress(value)
+                        continue
+                    if kind == "error":
+                        raise ServiceError(value)
+                    return value
+            except (EOFError, OSError) as e:
+                self._local.conn = None
+                conn.close()
+                if attempt == 1:
+                    raise ServiceUnavailable("Scraper service connection lost: %s" % e)
+                logger.warning("Scraper service connection lost, reconnecting: %s", e)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                conn = self._local.conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            except (OSError, multiprocessing.AuthenticationError) as e:
+                raise ServiceUnavailable("Scraper service unavailable at %s: %s" % (self.address, e))
+        return conn
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    if not config.SCRAPER_SERVICE_ADDRESS:
+        sys.exit("Set SCRAPER_SERVICE_ADDRESS to the Unix socket path to listen on")
+    service = ScraperService(
+        config.SCRAPER_SERVICE_ADDRESS,
+        authkey=config.SCRAPER_SERVICE_AUTHKEY,
+        workers=config.SCRAPER_SERVICE_WORKERS,
+        threads=config.SCRAPER_SERVICE_THREADS,
+    )
+    if config.SCRAPER_ENGINE == "selenium" or config.SCRAPER_FALLBACK:
+        import chromedriver
+        try:
+            # Workers are spawned fresh; hand them the path instead of each looking it up
+            os.environ["CHROMEDRIVER_PATH"] = chromedriver.resolve()
+        except chromedriver.DriverNotFound as e:
+            sys.exit(str(e))
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
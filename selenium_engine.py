@@ -0,0 +1,402 @@
+"""ARMS scraper that drives a headless Chrome through Selenium."""
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import urllib3
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import (
+    InvalidSessionIdException, NoSuchWindowException, TimeoutException, WebDriverException
+)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.chrome.options import Options
+
+import arms_parser
+import chromedriver
+import config
+import metrics
+import page_specs
+from errors import LoginFailed, ScrapeError, SessionExpired
+from readiness import element_present, timed, url_contains, wait_for
+from resource_filter import ResourceFilter
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PATH = page_specs.PROFILE.path
+GRADES_PATH = page_specs.GRADES.path
+ATTENDANCE_PATH = page_specs.ATTENDANCE.path
+PROBE_PATH = "/StudentPortal/Landing.aspx"
+
+# Authenticated GET that must not follow the forms-auth redirect to the login page
+_PROBE_JS = """
+    var done = arguments[arguments.length - 1];
+    fetch(arguments[0], {redirect: 'manual', credentials: 'same-origin'})
+        .then(function(response) { done(response.type !== 'opaqueredirect' && response.ok); })
+        .catch(function() { done(false); });
+"""
+
+resource_filter = (
+    ResourceFilter(config.RESOURCE_BLOCK_PATTERNS, config.RESOURCE_PAGE_RULES) if config.RESOURCE_BLOCKING else None
+)
+
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "expiry")
+
+# Page snapshots are parsed here (SELENIUM_PARSE_MODE=html) so the driver can
+# move on to the next tab meanwhile
+_parse_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="arms-parse")
+
+# Seconds between runs of the page script while a tab is still navigating
+UNLOAD_RETRY_PAUSE = 0.1
+
+# Longer than any page spec's own timeout, so the in-page wait always answers first
+SCRIPT_TIMEOUT = max(spec.timeout for spec in (page_specs.PROFILE, page_specs.GRADES, page_specs.ATTENDANCE)) + 10
+
+
+# Errors meaning the browser (or the chromedriver behind it) is gone, e.g. an
+# invalid session id or a refused connection after a chromedriver restart.
+# Anything else (a script error, an alert, a stale element) comes from a live browser.
+_BROWSER_LOST = (
+    InvalidSessionIdException,
+    NoSuchWindowException,
+    urllib3.exceptions.MaxRetryError,
+    urllib3.exceptions.ProtocolError,
+    ConnectionError,
+)
+
+
+def browser_lost(error):
+    """Whether ``error`` means the session's browser is gone and a new login is needed."""
+    return isinstance(error, _BROWSER_LOST)
+
+
+class CountingChrome(webdriver.Chrome):
+    """Chrome driver that counts the WebDriver commands (roundtrips to chromedriver) it sends.
+
+    ``roundtrips`` maps command name to count; the scraper clears it per request.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.roundtrips = {}
+        super().__init__(*args, **kwargs)
+
+    def execute(self, driver_command, params=None):
+        self.roundtrips[driver_command] = self.roundtrips.get(driver_command, 0) + 1
+        metrics.ROUNDTRIPS.inc("selenium", driver_command)
+        return super().execute(driver_command, params)
+
+
+def launch_driver():
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")  # Use new headless mode for compatibility
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--page-load-strategy=eager")
+    chrome_options.add_argument("--window-size=1280,720")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-logging")
+    chrome_options.add_argument("--log-level=3")
+    chrome_options.add_argument("--disable-animations")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    # Pages loading in a background tab must not be throttled
+    chrome_options.add_argument("--disable-background-timer-throttling")
+    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+    chrome_options.add_argument("--disable-renderer-backgrounding")
+
+    # Disable images, CSS, etc.
+    prefs = {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+        "profile.managed_default_content_settings.stylesheets": 2,
+        "profile.managed_default_content_settings.javascript": 1,
+        "profile.default_content_setting_values.cookies": 1,
+        "profile.managed_default_content_settings.plugins": 2,
+        "profile.managed_default_content_settings.popups": 2,
+        "profile.managed_default_content_settings.geolocation": 2,
+        "profile.managed_default_content_settings.media_stream": 2,
+    }
+    chrome_options.add_experimental_option("prefs", prefs)
+    if resource_filter is not None:
+        # Network events feed the blocked-request and byte counters
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
+    with timed(None, "driver:launch"):
+        if config.CHROMEDRIVER_SHARED:
+            service = chromedriver.shared_service.attach()
+        else:
+            service = Service(chromedriver.resolve())
+        driver = CountingChrome(service=service, options=chrome_options)
+    driver.set_page_load_timeout(20)
+    driver.set_script_timeout(SCRIPT_TIMEOUT)
+    return driver
+
+
+class SeleniumSession:
+    """A logged-in ARMS session on a Chrome driver taken from a ``DriverPool``."""
+
+    engine = "selenium"
+
+    def __init__(self, pool, base_url=None):
+        self.pool = pool
+        self.base_url = base_url or config.ARMS_BASE_URL
+        self.driver = None
+        # Seconds spent per page load / wait, reset by the caller per request
+        self.timings = {}
+        # Block list currently applied in each tab
+        self._blocked = {}
+
+    @property
+    def roundtrips(self):
+        """WebDriver commands sent per command name, reset by the caller per request."""
+        return getattr(self.driver, "roundtrips", {})
+
+    def login(self, username, password):
+        driver = self.driver = self._acquire()
+        try:
+            logger.info("Opening login page...")
+            self._get("/")
+            logger.info("Page loaded. Current URL: %s", driver.current_url)
+
+            wait_for(driver, element_present("txtusername"), 10, self.timings)
+            username_field = driver.find_element(By.ID, "txtusername")
+            password_field = driver.find_element(By.ID, "txtpassword")
+            login_button = driver.find_element(By.ID, "btnlogin")
+
+            logger.info("Entering credentials for user: %s", username)
+            username_field.send_keys(username)
+            password_field.send_keys(password)
+            login_button.click()
+
+            logger.info("Login button clicked. Waiting for redirection...")
+            wait_for(driver, url_contains("Landing.aspx"), 10, self.timings)
+            logger.info("Login successful. Current URL: %s", driver.current_url)
+        except Exception as e:
+            self.driver = None
+            self.pool.discard(driver)
+            raise LoginFailed("Login failed, please check credentials") from e
+
+    def restore(self, cookies):
+        """Resume a session from saved cookies instead of logging in; True if still valid."""
+        driver = self.driver = self._acquire()
+        try:
+            # Set over CDP so the driver doesn't have to load an ARMS page first
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": [self._cdp_cookie(c) for c in cookies]})
+            self._get(PROBE_PATH)
+            if "Landing.aspx" in driver.current_url:
+                logger.info("Session restored from saved cookies. Current URL: %s", driver.current_url)
+                return True
+        except Exception as e:
+            logger.warning("Could not restore saved cookies: %s", e)
+        self.driver = None
+        self.pool.discard(driver)
+        return False
+
+    def _acquire(self):
+        with timed(self.timings, "driver:acquire"):
+            return self.pool.acquire()
+
+    def export_cookies(self):
+        """The session cookies in ``cookie_store`` format."""
+        return [
+            {key: cookie[key] for key in COOKIE_FIELDS if key in cookie}
+            for cookie in self.driver.get_cookies()
+        ]
+
+    def _cdp_cookie(self, cookie):
+        cdp_cookie = {
+            "name": cookie["name"],
+            "value": cookie["value"],
+            "url": self.base_url + "/",
+            "path": cookie.get("path") or "/",
+            "secure": bool(cookie.get("secure")),
+            "httpOnly": bool(cookie.get("httpOnly")),
+        }
+        # Host-only cookies are pinned by the url; only keep explicit domain cookies
+        if (cookie.get("domain") or "").startswith("."):
+            cdp_cookie["domain"] = cookie["domain"]
+        if cookie.get("expiry"):
+            cdp_cookie["expires"] = cookie["expiry"]
+        return cdp_cookie
+
+    def fetch_profile(self):
+        logger.info("Navigating to Student Profile page...")
+        self._get(PROFILE_PATH)
+        logger.info("Profile page loaded. Current URL: %s", self.driver.current_url)
+        try:
+            return self._extract_profile()
+        finally:
+            self._record_network()
+
+    def fetch_grades(self):
+        logger.info("Navigating to Grades page...")
+        self._get(GRADES_PATH)
+        logger.info("Grades page loaded. Current URL: %s", self.driver.current_url)
+        try:
+            return self._extract_grades()
+        finally:
+            self._record_network()
+
+    def fetch_attendance(self):
+        logger.info("Navigating to Attendance Report page...")
+        self._get(ATTENDANCE_PATH)
+        logger.info("Attendance page loaded. Current URL: %s", self.driver.current_url)
+        try:
+            return self._extract_attendance()
+        finally:
+            self._record_network()
+
+    def fetch_profile_and_grades(self):
+        """Load DataProfile and MyCourse concurrently in two tabs of this session."""
+        main_tab, grades_tab = self._open_in_background_tab(GRADES_PATH)
+        try:
+            student_data = self.fetch_profile()
+            self.driver.switch_to.window(grades_tab)
+            results = self._extract_grades()
+        finally:
+            self._close_tab(grades_tab, main_tab)
+            self._record_network()
+        return student_data, results
+
+    def fetch_dashboard(self):
+        """Load profile, grades and attendance concurrently in three tabs."""
+        main_tab, grades_tab = self._open_in_background_tab(GRADES_PATH)
+        attendance_tab = None
+        try:
+            attendance_tab = self._open_in_background_tab(ATTENDANCE_PATH)[1]
+            student_data = self.fetch_profile()
+            self.driver.switch_to.window(grades_tab)
+            grades = self._read(page_specs.GRADES)
+            self.driver.switch_to.window(attendance_tab)
+            attendance = self._read(page_specs.ATTENDANCE)
+            results = self._extract_grades(grades)
+            attendance_data = self._extract_attendance(attendance)
+        finally:
+            if attendance_tab is not None:
+                self._close_tab(attendance_tab, main_tab)
+            self._close_tab(grades_tab, main_tab)
+            self._record_network()
+        return student_data, results, attendance_data
+
+    def _extract_profile(self):
+        student_data = self._read(page_specs.PROFILE).result()
+        logger.info("Student data extracted: %s", student_data)
+        return student_data
+
+    def _extract_grades(self, pending=None):
+        results = (pending or self._read(page_specs.GRADES)).result()["rows"]
+        logger.info("Grade rows extracted: %d", len(results))
+        return results
+
+    def _extract_attendance(self, pending=None):
+        attendance_data = (pending or self._read(page_specs.ATTENDANCE)).result()["rows"]
+        logger.info("Attendance data extracted: %s", attendance_data)
+        return attendance_data
+
+    def _read(self, spec):
+        """Wait for and read ``spec``'s page; returns a Future of its data.
+
+        In ``script`` parse mode the browser extracts the fields and the
+        Future is already done; in ``html`` mode it takes a snapshot of the
+        page that is parsed on ``_parse_executor``.
+        """
+        if config.SELENIUM_PARSE_MODE == "html":
+            result = self._run_spec(spec, spec.snapshot, "snapshot:")
+            return _parse_executor.submit(self._parse_snapshot, spec, result["html"], result["url"])
+        future = Future()
+        future.set_result(self._run_spec(spec, spec.compiled, "extract:")["data"])
+        return future
+
+    def _run_spec(self, spec, compiled, stage):
+        """Run ``page_specs.EXTRACT_JS`` in one ``execute_async_script`` call."""
+        label = stage + spec.name
+        deadline = time.time() + spec.timeout
+        with timed(self.timings, label):
+            while True:
+                try:
+                    result = self.driver.execute_async_script(page_specs.EXTRACT_JS, compiled)
+                    break
+                except WebDriverException as e:
+                    # A background tab may still have been on about:blank; run again on the loaded page
+                    if "unload" not in str(e).lower() or time.time() > deadline:
+                        raise
+                    logger.debug("Page navigated during %s, retrying", label)
+                    time.sleep(UNLOAD_RETRY_PAUSE)
+
+        waited = result["waited"] / 1000.0
+        self.timings["wait:" + spec.name] = round(self.timings.get("wait:" + spec.name, 0) + waited, 3)
+        metrics.observe_stage("wait:" + spec.name, waited)
+
+        if result["status"] == "expired":
+            raise SessionExpired("ARMS session expired (redirected to the login page).")
+        if result["status"] == "timeout":
+            logger.error("%s page not ready after %ss (%d polls). Current URL: %s",
+                         spec.name, spec.timeout, result["polls"], self.driver.current_url)
+            if spec.expire_on_timeout:
+                raise SessionExpired("Failed to load %s page. Possibly logged out." % spec.name)
+            raise TimeoutException("%s page not ready after %ss" % (spec.name, spec.timeout))
+        return result
+
+    def _parse_snapshot(self, spec, html, url):
+        with timed(self.timings, "parse:" + spec.name):
+            data = arms_parser.parse_spec(spec, html, url)
+        if data is None:
+            raise ScrapeError("%s table not found in the %s page snapshot" % (spec.table["id"], spec.name))
+        return data
+
+    def _get(self, path):
+        self._filter_requests(path)
+        with timed(self.timings, "load:" + (path.rsplit("/", 1)[-1] or "login")):
+            self.driver.get(self.base_url + path)
+
+    def _filter_requests(self, path, tab="main"):
+        """Apply the block list for ``path`` to the current tab if it changed."""
+        if resource_filter is None:
+            return
+        patterns = resource_filter.patterns_for(path)
+        if self._blocked.get(tab) != patterns:
+            resource_filter.apply(self.driver, patterns)
+            self._blocked[tab] = patterns
+
+    def _record_network(self):
+        if resource_filter is not None and self.driver is not None:
+            resource_filter.record(self.driver)
+
+    def is_alive(self):
+        """Cheap liveness probe: an authenticated request from the current page."""
+        try:
+            return bool(self.driver.execute_async_script(_PROBE_JS, self.base_url + PROBE_PATH))
+        except Exception as e:
+            logger.warning("Session probe failed: %s", e)
+            return False
+
+    def _open_in_background_tab(self, path):
+        """Start loading ``path`` in a new tab and switch back without waiting.
+
+        Returns ``(main tab, new tab)`` window handles.
+        """
+        driver = self.driver
+        main_tab = driver.current_window_handle
+        driver.switch_to.new_window("tab")
+        new_tab = driver.current_window_handle
+        self._filter_requests(path, new_tab)
+        # Assigning location returns at once, unlike driver.get()
+        driver.execute_script("window.location.href = arguments[0];", self.base_url + path)
+        driver.switch_to.window(main_tab)
+        return main_tab, new_tab
+
+    def _close_tab(self, tab, main_tab):
+        driver = self.driver
+        self._blocked.pop(tab, None)
+        try:
+            if tab in driver.window_handles:
+                driver.switch_to.window(tab)
+                driver.close()
+        finally:
+            driver.switch_to.window(main_tab)
+
+    def quit(self):
+        if self.driver is not None:
+            self.pool.discard(self.driver)
+            self.driver = None
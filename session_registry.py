@@ -0,0 +1,180 @@
+"""Sticky sessions across gunicorn workers.
+
+Every worker keeps its own logged-in sessions, so without help a user's
+next request usually lands on a worker that has to log in again. With a
+registry directory configured, each worker records the users whose sessions
+it holds in a shared SQLite table and serves scrapes for them to the other
+workers over its own Unix socket; a request for a user owned by another
+live worker is forwarded there instead of logging in a second time.
+"""
+import atexit
+import contextlib
+import glob
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+import scraper
+from errors import ServiceUnavailable
+from scraper_service import LocalServer, ScraperClient
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRegistry:
+    """username -> socket address of the worker holding the user's session.
+
+    Claims older than ``ttl`` seconds are ignored (the owner has most likely
+    evicted the session by then); ``ttl`` 0 keeps them until released.
+    """
+
+    def __init__(self, path, ttl=900):
+        self.path = path
+        self.ttl = ttl
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS owners ("
+                "username TEXT PRIMARY KEY, address TEXT NOT NULL, claimed REAL NOT NULL)"
+            )
+
+    def owner(self, username):
+        with self._connect() as db:
+            row = db.execute("SELECT address, claimed FROM owners WHERE username = ?", (username,)).fetchone()
+        if row is None or (self.ttl > 0 and time.time() - row[1] > self.ttl):
+            return None
+        return row[0]
+
+    def claim(self, username, address):
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO owners (username, address, claimed) VALUES (?, ?, ?)",
+                (username, address, time.time()),
+            )
+
+    def release(self, username, address):
+        """Drop ``username``'s claim if ``address`` still holds it."""
+        with self._connect() as db:
+            db.execute("DELETE FROM owners WHERE username = ? AND address = ?", (username, address))
+
+    def release_all(self, address):
+        with self._connect() as db:
+            db.execute("DELETE FROM owners WHERE address = ?", (address,))
+
+    def count(self, address):
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM owners WHERE address = ?", (address,)).fetchone()[0]
+
+    def _connect(self):
+        # One short-lived connection per call: safe across threads and forked workers
+        return contextlib.closing(sqlite3.connect(self.path, timeout=5, isolation_level=None))
+
+
+class StickyScraper:
+    """The ``scraper`` module, plus forwarding to the worker that owns each user.
+
+    Drop-in for ``scraper`` in app.py when ``SESSION_REGISTRY_DIR`` is set.
+    """
+
+    def __init__(self, directory, ttl=900, authkey=None):
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self.directory = directory
+        self.authkey = authkey
+        self.registry = SessionRegistry(os.path.join(directory, "sessions.sqlite3"), ttl)
+        self.address = None
+        self._server = None
+        self._jobs = None
+        self._peers = {}
+        self._lock = threading.Lock()
+        self.forwarded = 0
+        self.takeovers = 0
+
+    def start(self):
+        """Start the local scraper and this worker's socket (call in each worker after fork)."""
+        scraper.start()
+        self.address = self._address_of(os.getpid())
+        self._server = LocalServer(self.address, {
+            "fetch_payload": self._fetch_local,
+            "stats": lambda progress: self.stats(),
+            "metrics": lambda progress: scraper.metrics_snapshot(),
+            "wait_job": lambda job_id, version, timeout, progress: self._jobs.wait(job_id, version, timeout),
+        }, self.authkey)
+        self._server.start()
+        atexit.register(self.stop)
+        logger.info("Serving sessions of this worker on %s", self.address)
+
+    def stop(self):
+        if self._server is not None:
+            self.registry.release_all(self.address)
+            self._server.close()
+            self._server = None
+
+    def serve_jobs(self, job_queue):
+        """Serve ``job_queue``'s jobs to the other workers; its job ids then name this worker."""
+        job_queue.id_prefix = "%d-" % os.getpid()
+        self._jobs = job_queue
+
+    def wait_job(self, job_id, version=None, timeout=0):
+        """``JobQueue.wait`` on the worker whose id prefix ``job_id`` carries."""
+        pid, _, _ = job_id.partition("-")
+        if not pid.isdigit() or int(pid) == os.getpid():
+            return self._jobs.wait(job_id, version, timeout)
+        try:
+            return self._peer(self._address_of(pid)).call("wait_job", (job_id, version, timeout))
+        except ServiceUnavailable:
+            return None  # that worker is gone, and its jobs with it
+
+    def fetch_payload(self, kind, username, password, force_refresh=False, progress=scraper.ignore_progress):
+        owner = self.registry.owner(username)
+        if owner is not None and owner != self.address:
+            try:
+                payload = self._peer(owner).fetch_payload(kind, username, password, force_refresh, progress)
+                with self._lock:
+                    self.forwarded += 1
+                return payload
+            except ServiceUnavailable as e:
+                logger.warning("Owner of user %s at %s is gone, taking over: %s", username, owner, e)
+                self.registry.release(username, owner)
+                with self._lock:
+                    self.takeovers += 1
+        return self._fetch_local(kind, username, password, force_refresh, progress)
+
+    def stats(self):
+        return dict(scraper.stats(), registry={
+            "address": self.address,
+            "owned": self.registry.count(self.address) if self.address else 0,
+            "forwarded": self.forwarded,
+            "takeovers": self.takeovers,
+        })
+
+    def metrics_snapshot(self):
+        """Metrics of every live worker, so any of them can answer a scrape of /metrics."""
+        snapshots = [scraper.metrics_snapshot()]
+        for address in glob.glob(self._address_of("*")):
+            if address == self.address:
+                continue
+            try:
+                snapshots.append(self._peer(address).call("metrics", ()))
+            except ServiceUnavailable:
+                pass  # stale socket of a worker that died
+        return metrics.merge(snapshots)
+
+    def _fetch_local(self, kind, username, password, force_refresh=False, progress=scraper.ignore_progress):
+        payload = scraper.fetch_payload(kind, username, password, force_refresh, progress)
+        if payload.get("success") and self.address is not None:
+            # Refreshes the claim on every use so it outlives the registry TTL while in use
+            self.registry.claim(username, self.address)
+        return payload
+
+    def _address_of(self, pid):
+        return os.path.join(self.directory, "worker-%s.sock" % pid)
+
+    def _peer(self, address):
+        with self._lock:
+            client = self._peers.get(address)
+            if client is None:
+                client = self._peers[address] = ScraperClient(address, self.authkey)
+            return client
@@ -0,0 +1,266 @@
+import collections
+import contextlib
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Entry:
+    """A logged-in engine session owned by one username."""
+
+    def __init__(self, username, session, credential):
+        self.username = username
+        self.session = session
+        self.credential = credential  # keyed hash of the password it logged in with
+        self.created = time.time()
+        self.last_used = self.created
+
+
+class _UserLock:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.holders = 0  # threads holding or waiting for the lock
+
+
+class SessionStore:
+    """Bounded LRU store of logged-in sessions with idle-TTL eviction.
+
+    At most ``max_sessions`` sessions are kept; storing one more evicts the
+    least recently used one that is not leased, and sessions kept over the
+    cap only because they were leased are evicted once their lease ends. Sessions unused for
+    ``idle_ttl`` seconds are evicted by the reaper thread, which is also the
+    only place evicted sessions are handed to ``on_evict`` (which quits them)
+    so request threads never block on ``driver.quit()``.
+
+    Work on one user's session is serialised through ``lease()``. Each
+    session is stored with a keyed hash of the password it was logged in
+    with, and a request carrying a different password is not given it.
+    """
+
+    def __init__(self, on_evict, max_sessions=6, idle_ttl=900, reap_interval=30):
+        self.on_evict = on_evict
+        self.max_sessions = max(1, max_sessions)
+        self.idle_ttl = idle_ttl
+        self.reap_interval = reap_interval
+
+        self._entries = collections.OrderedDict()
+        self._user_locks = {}
+        self._lock = threading.Lock()
+        self._evicted = []
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.evictions = collections.Counter()
+        self.lease_wait_total = 0.0
+        self.leases = 0
+        self.mismatches = 0
+        # Hashes never leave the process, so a per-process key is enough
+        self._secret = os.urandom(32)
+
+    def start(self):
+        """Start the reaper thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._reap_loop, name="session-reaper", daemon=True)
+            self._thread.start()
+
+    @contextlib.contextmanager
+    def lease(self, username, password=None):
+        """Hold ``username``'s session exclusively for the duration of the block.
+
+        Yields ``(session or None, seconds spent waiting for the lease)``; see
+        ``get()`` for when the session is withheld.
+        Logging in and storing the new session with ``put()`` should happen
+        inside the lease so concurrent requests don't log in twice.
+        """
+        start = time.time()
+        self._acquire_user(username)
+        waited = time.time() - start
+        try:
+            with self._lock:
+                self.leases += 1
+                self.lease_wait_total += waited
+            if waited > 0.01:
+                logger.info("Waited %.2fs for the session of user %s", waited, username)
+            yield self.get(username, password), waited
+        finally:
+            self._release_user(username)
+
+    def get(self, username, password=None):
+        """Return the live session for ``username`` and mark it recently used.
+
+        With a ``password`` that is not the one the session logged in with,
+        returns None and leaves the session stored. Without one the session
+        is returned (attendance may be read without the password).
+        """
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            if self._expired(entry, time.time()):
+                self._evict(username, "idle")
+                return None
+            if password and not hmac.compare_digest(entry.credential, self._credential(password)):
+                self.mismatches += 1
+                logger.warning("Password does not match the stored session of user %s", username)
+                return None
+            entry.last_used = time.time()
+            self._entries.move_to_end(username)
+            return entry.session
+
+    def put(self, username, session, password):
+        """Store a session freshly logged in with ``password``, evicting LRU sessions over the cap."""
+        credential = self._credential(password)
+        with self._lock:
+            if username in self._entries:
+                self._evict(username, "replaced")
+            self._entries[username] = Entry(username, session, credential)
+            self._trim(keep=username)
+
+    def start_keepalive(self, probe, interval=240, hot_window=600):
+        """Periodically run ``probe(session)`` on recently used sessions.
+
+        Keeps hot ARMS sessions from timing out server-side, and evicts the
+        ones whose probe returns False so the next request logs in straight
+        away instead of discovering the expiry mid-scrape. Sessions busy with
+        a request are skipped, and probing does not count as use for the
+        idle TTL.
+        """
+        if interval <= 0:
+            return
+        thread = threading.Thread(
+            target=self._keepalive_loop, args=(probe, interval, hot_window), name="session-keepalive", daemon=True
+        )
+        thread.start()
+
+    def remove(self, username):
+        """Drop the session for ``username`` (e.g. after it was logged out)."""
+        with self._lock:
+            if username in self._entries:
+                self._evict(username, "removed")
+
+    def remove_where(self, predicate, reason="removed"):
+        """Drop every session for which ``predicate(session)`` is true; returns how many."""
+        with self._lock:
+            doomed = [username for username, entry in self._entries.items() if predicate(entry.session)]
+            for username in doomed:
+                self._evict(username, reason)
+        return len(doomed)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "live": len(self._entries),
+                "max_sessions": self.max_sessions,
+                "idle_ttl": self.idle_ttl,
+                "leased": len(self._user_locks),
+                "pending_quit": len(self._evicted),
+                "evictions": dict(self.evictions),
+                "leases": self.leases,
+                "lease_wait_total": round(self.lease_wait_total, 3),
+                "password_mismatches": self.mismatches,
+            }
+
+    def close(self):
+        """Evict every session and quit them synchronously."""
+        with self._lock:
+            for username in list(self._entries):
+                self._evict(username, "shutdown")
+        self._drain()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _acquire_user(self, username, blocking=True):
+        with self._lock:
+            user_lock = self._user_locks.setdefault(username, _UserLock())
+            user_lock.holders += 1
+        if user_lock.lock.acquire(blocking):
+            return True
+        self._release_user(username, locked=False)
+        return False
+
+    def _release_user(self, username, locked=True):
+        with self._lock:
+            user_lock = self._user_locks[username]
+            if locked:
+                user_lock.lock.release()
+            user_lock.holders -= 1
+            if user_lock.holders == 0:
+                del self._user_locks[username]
+                # Leased sessions are skipped by put(); enforce the cap now this one is free
+                self._trim()
+
+    def _expired(self, entry, now):
+        return self.idle_ttl > 0 and now - entry.last_used > self.idle_ttl
+
+    def _credential(self, password):
+        return hmac.new(self._secret, (password or "").encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def _trim(self, keep=None):
+        # Caller holds self._lock
+        for victim in list(self._entries):
+            if len(self._entries) <= self.max_sessions:
+                break
+            if victim != keep and victim not in self._user_locks:
+                self._evict(victim, "lru")
+
+    def _evict(self, username, reason):
+        # Caller holds self._lock
+        entry = self._entries.pop(username)
+        self._evicted.append(entry.session)
+        self.evictions[reason] += 1
+        logger.info("Evicting session for user %s (%s)", username, reason)
+        self._wakeup.set()
+
+    def _drain(self):
+        with self._lock:
+            evicted, self._evicted = self._evicted, []
+        for session in evicted:
+            try:
+                self.on_evict(session)
+            except Exception as e:
+                logger.error("Failed to release evicted session: %s", e)
+
+    def _keepalive_loop(self, probe, interval, hot_window):
+        while True:
+            time.sleep(interval)
+            now = time.time()
+            with self._lock:
+                hot = [
+                    username for username, entry in self._entries.items()
+                    if username not in self._user_locks and now - entry.last_used <= hot_window
+                ]
+            for username in hot:
+                if not self._acquire_user(username, blocking=False):
+                    continue
+                try:
+                    with self._lock:
+                        entry = self._entries.get(username)
+                    if entry is None or probe(entry.session):
+                        continue
+                    with self._lock:
+                        if self._entries.get(username) is entry:
+                            self._evict(username, "expired")
+                except Exception as e:
+                    logger.error("Keep-alive probe failed for user %s: %s", username, e)
+                finally:
+                    self._release_user(username)
+            self._drain()
+
+    def _reap_loop(self):
+        while True:
+            self._wakeup.wait(self.reap_interval)
+            self._wakeup.clear()
+            now = time.time()
+            with self._lock:
+                for username, entry in list(self._entries.items()):
+                    if username not in self._user_locks and self._expired(entry, now):
+                        self._evict(username, "idle")
+            self._drain()